@@ -23,7 +23,7 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('tags', 'views', 'published_date', 'updated_date')
         }),
     )
-    filter_horizontal = ('tags', 'likes')
+    filter_horizontal = ('likes',)
     date_hierarchy = 'published_date'
     ordering = ('-published_date',)
     
@@ -45,11 +45,11 @@ class PostAdmin(admin.ModelAdmin):
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ('author', 'post_preview', 'content_preview', 'created_date', 'approved', 'is_reply')
+    list_display = ('author', 'post_preview', 'content_preview', 'created_date', 'approved')
     list_filter = ('approved', 'created_date', 'post')
     search_fields = ('content', 'author__username', 'post__title')
     actions = ['approve_comments', 'disapprove_comments']
-    readonly_fields = ('created_date', 'updated_date')
+    readonly_fields = ('created_date',)
     
     def post_preview(self, obj):
         return format_html('<a href="{}">{}</a>', 
@@ -61,11 +61,6 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = 'Content'
     
-    def is_reply(self, obj):
-        return bool(obj.parent)
-    is_reply.boolean = True
-    is_reply.short_description = 'Reply'
-    
     def approve_comments(self, request, queryset):
         queryset.update(approved=True)
     approve_comments.short_description = "Approve selected comments"
@@ -86,4 +81,4 @@ class UserProfileAdmin(admin.ModelAdmin):
     
     def comment_count(self, obj):
         return obj.user.comment_set.count()
-    comment_count.short_description = 'Comments'
\ No newline at end of file
+    comment_count.short_description = 'Comments'
\ No newline at end of file
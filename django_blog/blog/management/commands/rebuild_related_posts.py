@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored related posts for all blog posts"
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Computed related posts for {count} posts"))
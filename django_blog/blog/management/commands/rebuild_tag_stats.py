@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.tag_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the tag post counts and tag co-occurrence table"
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Counted {count} tags"))
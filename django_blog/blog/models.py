@@ -7,7 +7,8 @@ from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
-from .taggit.managers import TaggableManager
+from taggit.managers import TaggableManager
+from taggit.models import Tag
 
 # Create your models here.
 class Post(models.Model):
@@ -70,41 +71,13 @@ class Post(models.Model):
         reading_time = max(1, round(word_count / words_per_minute))
         return f"{reading_time} min read"
     
-    def increment_views(self):
-        """Increment view count"""
-        self.views += 1
-        self.save(update_fields=['views'])
-
-class Comment(models.Model):
-    """
-    Comment Model for blog posts
-    """
-    post = models.ForeignKey('Post', on_delete=models.CASCADE, related_name='comments')
-    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
-    content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    class Meta:
-        ordering = ['created_at']
-    
-    def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
-    
-    def save(self, *args, **kwargs):
-        if self.pk:  # If the comment already exists
-            self.updated_at = timezone.now()
-        super().save(*args, **kwargs)
+    def increment_views(self, request=None):
+        """Count a view (buffered and written in batches, see view_counter.py)"""
+        from .view_counter import record_view
 
+        if record_view(self, request):
+            self.views += 1
 
-    @property
-    def is_reply(self):
-        return self.parent is not None
-    
-    @property
-    def get_replies(self):
-        return Comment.objects.filter(parent=self, approved=True)
-    
 class Comment(models.Model):
     """
     Comments Model
@@ -134,19 +107,54 @@ class UserProfile(models.Model):
     def __str__(self):
         return f'{self.user.username} Profile'
     
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Create UserProfile automatically when a User is created"""
-    if created:
-        UserProfile.objects.create(user=instance)
+class RelatedPost(models.Model):
+    """
+    Precomputed "related posts": the top-K published posts by tag overlap
+    (Jaccard similarity) for each post, maintained by blog/related.py
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    try:
-        instance.profile.save()
-    except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=instance)
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='related_post_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.2f})'
+
+class TagStats(models.Model):
+    """
+    Number of published posts per tag, maintained by blog/tag_stats.py
+    """
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    post_count = models.PositiveIntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.post_count}'
+
+class TagCooccurrence(models.Model):
+    """
+    Number of published posts carrying both tags. Stored in both directions
+    and only for pairs that occur, maintained by blog/tag_stats.py
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='cooccurrences')
+    other = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'other'], name='tag_cooccurrence_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-post_count'], name='tag_cooccurrence_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag_id} & {self.other_id}: {self.post_count}'
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -160,4 +168,4 @@ def save_user_profile(sender, instance, **kwargs):
     try:
         instance.profile.save()
     except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
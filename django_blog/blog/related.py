@@ -0,0 +1,195 @@
+"""
+Precomputed related posts.
+
+For every post the BLOG_RELATED_POSTS_K published posts with the highest
+tag overlap (Jaccard similarity: shared tags / tags on either post) are
+stored as RelatedPost rows, so the detail page reads K rows instead of
+joining the tagged-item table.
+
+Rows are refreshed after a post's tags or status change (see signals.py).
+Besides the post itself, only the posts whose lists can actually change
+are recomputed: those that currently list it, and those it now scores
+high enough to enter. For posts on popular tags the latter can be
+thousands, so at most BLOG_RELATED_POSTS_MAX_FANOUT of them (highest
+score first) are refreshed inline; the rest catch up on the next
+`manage.py rebuild_related_posts`, which recomputes everything.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from taggit.models import TaggedItem
+
+from .models import Post, RelatedPost
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def _overlaps(post_ids, published_only=True):
+    """{post id: {other post id: number of shared tags}}"""
+    if not post_ids:
+        return {}
+    tagged = TaggedItem._meta.db_table
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    published = "AND p.status = 'published'" if published_only else ""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT a.object_id, b.object_id, COUNT(*) FROM {tagged} a "
+            f"JOIN {tagged} b ON b.tag_id = a.tag_id AND b.content_type_id = a.content_type_id "
+            f"AND b.object_id <> a.object_id "
+            f"JOIN {Post._meta.db_table} p ON p.id = b.object_id {published} "
+            f"WHERE a.content_type_id = %s AND a.object_id IN ({placeholders}) "
+            f"GROUP BY a.object_id, b.object_id",
+            [ContentType.objects.get_for_model(Post).pk, *post_ids],
+        )
+        overlaps = {}
+        for post_id, other_id, shared in cursor.fetchall():
+            overlaps.setdefault(post_id, {})[other_id] = shared
+        return overlaps
+
+
+def _tag_counts(post_ids):
+    counts = {}
+    tagged = TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+    for chunk in _chunks(post_ids):
+        counts.update(
+            tagged.filter(object_id__in=chunk).values('object_id').annotate(n=Count('id')).values_list('object_id', 'n')
+        )
+    return counts
+
+
+def scores(post_ids, published_only=True):
+    """{post id: {other post id: Jaccard similarity}} for posts sharing at least one tag"""
+    overlaps = _overlaps(list(post_ids), published_only)
+    sizes = _tag_counts(set(overlaps) | {other for others in overlaps.values() for other in others})
+    return {
+        post_id: {
+            other_id: shared / (sizes[post_id] + sizes[other_id] - shared)
+            for other_id, shared in others.items()
+        }
+        for post_id, others in overlaps.items()
+    }
+
+
+def top_related(post_ids):
+    """{post id: [(related post id, score), ...]}, best first (newer posts first on ties)"""
+    k = _setting('BLOG_RELATED_POSTS_K', 3)
+    return {
+        post_id: sorted(others.items(), key=lambda item: (-item[1], -item[0]))[:k]
+        for post_id, others in scores(post_ids).items()
+    }
+
+
+def rebuild_for(post_ids):
+    """Recompute the stored rows of the given posts; returns the number of rows written"""
+    written = 0
+    for chunk in _chunks(set(post_ids)):
+        # Posts deleted since the refresh was queued just lose their rows
+        existing = list(Post.objects.filter(id__in=chunk).values_list('id', flat=True))
+        rows = [
+            RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+            for post_id, related in top_related(existing).items()
+            for rank, (related_id, score) in enumerate(related)
+        ]
+        with transaction.atomic():
+            RelatedPost.objects.filter(post_id__in=chunk).delete()
+            RelatedPost.objects.bulk_create(rows)
+        written += len(rows)
+    return written
+
+
+def affected_by(post_ids):
+    """The given posts plus every post whose related list they can change"""
+    affected = set(post_ids)
+    affected.update(RelatedPost.objects.filter(related_id__in=post_ids).values_list('post_id', flat=True))
+
+    published = list(Post.objects.filter(id__in=post_ids, status='published').values_list('id', flat=True))
+    # Drafts keep related lists too, so candidates aren't limited to published posts
+    candidates = {}
+    for others in scores(published, published_only=False).values():
+        for other_id, score in others.items():
+            candidates[other_id] = max(score, candidates.get(other_id, 0))
+
+    k = _setting('BLOG_RELATED_POSTS_K', 3)
+    max_fanout = _setting('BLOG_RELATED_POSTS_MAX_FANOUT', 200)
+    # Best candidates first, so the cap leaves out the lists least likely to change
+    ordered = sorted(set(candidates) - affected, key=lambda other_id: (-candidates[other_id], -other_id))
+    entering = 0
+    for start in range(0, len(ordered), BATCH_SIZE):
+        chunk = ordered[start:start + BATCH_SIZE]
+        lists = {
+            row['post_id']: row for row in
+            RelatedPost.objects.filter(post_id__in=chunk).values('post_id').annotate(n=Count('id'), low=Min('score'))
+        }
+        for other_id in chunk:
+            row = lists.get(other_id)
+            # A post enters another's list if there is room or it scores at least the current last entry
+            if row is None or row['n'] < k or candidates[other_id] >= row['low']:
+                if entering >= max_fanout:
+                    logger.info("Related posts fan-out for %s capped at %d lists", sorted(post_ids), max_fanout)
+                    return affected
+                affected.add(other_id)
+                entering += 1
+    return affected
+
+
+def refresh(post_ids):
+    """Bring related lists up to date after the given posts' tags or status changed"""
+    return rebuild_for(affected_by(post_ids))
+
+
+def rebuild():
+    """
+    Recompute every post's related list; returns the number of posts processed.
+    Each batch replaces its own posts' rows in one transaction (rows of deleted
+    posts go with them by cascade), so readers never see an emptied list.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        post_ids = list(Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not post_ids:
+            return total
+        rebuild_for(post_ids)
+        total += len(post_ids)
+        last_id = post_ids[-1]
+
+
+_pending = threading.local()
+
+
+def schedule_refresh(post_id):
+    """Refresh once the current transaction commits, batched like search.schedule_index"""
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(post_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    post_ids, _pending.ids = list(getattr(_pending, 'ids', ())), set()
+    if post_ids:
+        refresh(post_ids)
+
+
+def related_posts(post):
+    """The stored related posts for post, best first"""
+    return [
+        entry.related for entry in
+        RelatedPost.objects.filter(post=post).select_related('related').order_by('rank')
+    ]
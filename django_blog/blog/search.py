@@ -0,0 +1,294 @@
+"""
+Full-text search over blog posts.
+
+Each post has one search document made of its title, tag names, excerpt
+and content (weighted in that order), kept in a side table owned by the
+backend. The backend is picked from the database vendor, or set with
+BLOG_SEARCH_BACKEND:
+
+    PostgresSearchBackend   tsvector table with a GIN index; ts_rank, ts_headline
+    SQLiteSearchBackend     FTS5 table; bm25, snippet()
+    IcontainsSearchBackend  plain icontains, for anything else
+
+The tables are created by migration 0004_post_search. Documents are
+refreshed after a post or its tags change (see signals.py) and can be
+rebuilt with `manage.py rebuild_search_index`.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from taggit.models import TaggedItem
+
+from .models import Post
+
+POSTS_TABLE = Post._meta.db_table
+BATCH_SIZE = 500
+
+# Highlight markers chosen so they can't occur in post text; swapped for
+# <mark> after the snippet has been HTML-escaped
+_START, _STOP = '\x02', '\x03'
+
+
+def documents(post_ids=None):
+    """(id, title, tags, excerpt, content) for the given posts, or all posts"""
+    posts = Post.objects.order_by('id').values_list('id', 'title', 'excerpt', 'content')
+    tagged = TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+    if post_ids is not None:
+        posts = posts.filter(id__in=post_ids)
+        tagged = tagged.filter(object_id__in=post_ids)
+    tags = {}
+    for object_id, name in tagged.values_list('object_id', 'tag__name'):
+        tags.setdefault(object_id, []).append(name)
+    return [
+        (post_id, title, ' '.join(tags.get(post_id, [])), excerpt, content)
+        for post_id, title, excerpt, content in posts
+    ]
+
+
+def render_snippet(raw):
+    return mark_safe(escape(raw).replace(_START, '<mark>').replace(_STOP, '</mark>'))
+
+
+class BaseSearchBackend:
+    def index(self, post_ids):
+        """(Re)index the given posts"""
+
+    def remove(self, post_ids):
+        """Drop the given posts from the index"""
+
+    def rebuild(self):
+        """Reindex every post; returns the number of posts indexed"""
+        return Post.objects.count()
+
+    def search(self, queryset, query):
+        """Filter queryset to matches, annotated with search_rank (higher is better)"""
+        raise NotImplementedError
+
+    def snippets(self, post_ids, query):
+        """{post id: highlighted HTML snippet} for the given posts"""
+        return {}
+
+
+class IcontainsSearchBackend(BaseSearchBackend):
+    def search(self, queryset, query):
+        matches = Q()
+        for term in query.split():
+            term_matches = Q(title__icontains=term) | Q(excerpt__icontains=term) | Q(content__icontains=term)
+            # A subquery rather than a join, so no distinct() is needed
+            tagged = Post.objects.filter(tags__name__icontains=term).values('pk')
+            matches &= term_matches | Q(pk__in=tagged)
+        return queryset.filter(matches)
+
+
+class _TableSearchBackend(BaseSearchBackend):
+    """Backends keeping documents in a side table keyed by post id"""
+    table = None
+    key = None
+
+    def rebuild(self):
+        # Each batch replaces its own documents in one transaction, so
+        # searches keep finding every post while the index is rebuilt
+        total = 0
+        last_id = 0
+        while True:
+            post_ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+            )
+            if not post_ids:
+                break
+            self.index(post_ids)
+            total += len(post_ids)
+            last_id = post_ids[-1]
+        # Documents of posts deleted without their signal running
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {self.key} NOT IN (SELECT id FROM {POSTS_TABLE})")
+        return total
+
+
+class PostgresSearchBackend(_TableSearchBackend):
+    table = f'{POSTS_TABLE}_search'
+    key = 'post_id'
+    config = 'english'
+    document_sql = (
+        "setweight(to_tsvector(%s, %s), 'A') || setweight(to_tsvector(%s, %s), 'B') || "
+        "setweight(to_tsvector(%s, %s), 'C') || setweight(to_tsvector(%s, %s), 'D')"
+    )
+
+    def tsquery(self):
+        return f"websearch_to_tsquery('{self.config}', %s)"
+
+    def index(self, post_ids):
+        rows = documents(post_ids)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Posts deleted since the change was queued simply have no row
+            cursor.execute(f"DELETE FROM {self.table} WHERE post_id = ANY(%s)", [list(post_ids)])
+            for post_id, *fields in rows:
+                params = [value for field in fields for value in (self.config, field)]
+                cursor.execute(
+                    f"INSERT INTO {self.table} (post_id, document) VALUES (%s, {self.document_sql})",
+                    [post_id, *params],
+                )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE post_id = ANY(%s)", [list(post_ids)])
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery()
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT post_id FROM {self.table} WHERE document @@ {tsquery}", [query])
+        ).annotate(search_rank=RawSQL(
+            f"SELECT ts_rank(document, {tsquery}) FROM {self.table} WHERE post_id = {POSTS_TABLE}.id",
+            [query],
+            output_field=FloatField(),
+        ))
+
+    def snippets(self, post_ids, query):
+        options = f'StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2'
+        tsquery = self.tsquery()
+        # Like snippet(-1) on SQLite: headline the content, or the field that
+        # matched when it didn't (title-only matches still get highlighted)
+        headline = f"ts_headline('{self.config}', {{}}, {tsquery}, %s)"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, CASE "
+                f"WHEN to_tsvector('{self.config}', content) @@ {tsquery} THEN {headline.format('content')} "
+                f"WHEN to_tsvector('{self.config}', excerpt) @@ {tsquery} THEN {headline.format('excerpt')} "
+                f"ELSE {headline.format('title')} END "
+                f"FROM {POSTS_TABLE} WHERE id = ANY(%s)",
+                [query, query, options, query, query, options, query, options, list(post_ids)],
+            )
+            return {post_id: render_snippet(raw) for post_id, raw in cursor.fetchall()}
+
+
+class SQLiteSearchBackend(_TableSearchBackend):
+    table = f'{POSTS_TABLE}_fts'
+    key = 'rowid'
+    # bm25() column weights, in schema order
+    weights = '10.0, 5.0, 2.0, 1.0'
+
+    @staticmethod
+    def to_match(query):
+        """Quote every term so user input can't use FTS5 query syntax"""
+        terms = ['"%s"' % term.replace('"', '""') for term in query.split()]
+        return ' '.join(terms)
+
+    def index(self, post_ids):
+        if not post_ids:
+            return
+        rows = documents(post_ids)
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", list(post_ids))
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, tags, excerpt, content) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove(self, post_ids):
+        if not post_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", list(post_ids))
+
+    def search(self, queryset, query):
+        match = self.to_match(query)
+        if not match:
+            return queryset.none()
+        # bm25() is lower-is-better; negate it so search_rank sorts like ts_rank
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        ).annotate(search_rank=RawSQL(
+            f"SELECT -bm25({self.table}, {self.weights}) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {POSTS_TABLE}.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def snippets(self, post_ids, query):
+        match = self.to_match(query)
+        if not match or not post_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            # Column -1: take the snippet from whichever column matched best
+            cursor.execute(
+                f"SELECT rowid, snippet({self.table}, -1, %s, %s, '…', 24) FROM {self.table} "
+                f"WHERE {self.table} MATCH %s AND rowid IN ({placeholders})",
+                [_START, _STOP, match, *post_ids],
+            )
+            return {post_id: render_snippet(raw) for post_id, raw in cursor.fetchall()}
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = IcontainsSearchBackend()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'BLOG_SEARCH_BACKEND':
+        _backend = None
+
+
+_pending = threading.local()
+
+
+def schedule_index(post_id):
+    """
+    Reindex the post once the current transaction commits. Changes are
+    batched: the first callback to run indexes everything pending and the
+    rest find nothing left (ids from rolled-back transactions are simply
+    reindexed from the current rows).
+    """
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(post_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    post_ids, _pending.ids = list(getattr(_pending, 'ids', ())), set()
+    if post_ids:
+        get_backend().index(post_ids)
+
+
+def search_posts(queryset, query):
+    """Posts in queryset matching query, best match first (newest first on ties)"""
+    results = get_backend().search(queryset, query)
+    if 'search_rank' in results.query.annotations:
+        results = results.order_by('-search_rank', '-published_date', '-id')
+    return results
+
+
+def attach_snippets(posts, query):
+    """Set post.search_snippet (highlighted HTML, or None) on a page of results"""
+    posts = list(posts)
+    found = get_backend().snippets([post.pk for post in posts], query) if posts else {}
+    for post in posts:
+        post.search_snippet = found.get(post.pk)
+    return posts
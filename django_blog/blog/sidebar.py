@@ -0,0 +1,96 @@
+"""
+Cached sidebar widgets (popular tags, recent comments, most viewed posts).
+
+The widgets are the same for every visitor, so they are computed once and
+cached. Entries are fresh for BLOG_SIDEBAR_TTL seconds; for a further
+BLOG_SIDEBAR_STALE_TTL seconds a stale copy is still served while one
+background thread recomputes it (stale-while-revalidate). Post, comment
+and tag changes mark the entry stale rather than dropping it (see
+signals.py), so the next visitor still gets the old widgets while they
+are recomputed. Popular tags come from TagStats (published posts only),
+like the tag cloud.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'blog:sidebar'
+LOCK_KEY = 'blog:sidebar:refreshing'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def compute():
+    from . import tag_stats
+    from .models import Comment, Post
+
+    return {
+        'popular_tags': tag_stats.tag_cloud(limit=10),
+        'recent_comments': list(
+            Comment.objects.filter(approved=True).select_related('author', 'post').order_by('-created_date')[:5]
+        ),
+        'popular_posts': list(Post.objects.filter(status='published').order_by('-views')[:5]),
+    }
+
+
+def refresh():
+    """Recompute and cache the widgets; returns them"""
+    ttl = _setting('BLOG_SIDEBAR_TTL', 300)
+    data = compute()
+    cache.set(
+        CACHE_KEY,
+        {'data': data, 'fresh_until': time.time() + ttl},
+        ttl + _setting('BLOG_SIDEBAR_STALE_TTL', 600),
+    )
+    return data
+
+
+def _refresh_in_background():
+    # Only one process/thread refreshes at a time; the lock expires on its own if it dies
+    if not cache.add(LOCK_KEY, 1, 60):
+        return
+
+    def run():
+        try:
+            refresh()
+        except Exception:
+            logger.exception("Sidebar refresh failed")
+        finally:
+            cache.delete(LOCK_KEY)
+            close_old_connections()
+
+    threading.Thread(target=run, name='sidebar-refresh', daemon=True).start()
+
+
+def get_sidebar_context():
+    entry = cache.get(CACHE_KEY)
+    if entry is None:
+        return refresh()
+    if entry['fresh_until'] < time.time():
+        _refresh_in_background()
+    return entry['data']
+
+
+def invalidate():
+    """Mark the widgets stale: served once more while a background refresh runs"""
+    entry = cache.get(CACHE_KEY)
+    if entry is not None:
+        entry['fresh_until'] = 0
+        cache.set(CACHE_KEY, entry, _setting('BLOG_SIDEBAR_STALE_TTL', 600))
+
+
+class SidebarMixin:
+    """Adds the cached sidebar widgets to a view's context"""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(get_sidebar_context())
+        return context
@@ -0,0 +1,109 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from taggit.models import Tag, TaggedItem
+
+from .models import Comment, Post, RelatedPost
+from . import related, search, sidebar, tag_stats
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def invalidate_sidebar(sender, **kwargs):
+    """Mark the cached sidebar stale; view-count flushes don't save() and don't land here"""
+    sidebar.invalidate()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    """Reindex after commit, skipping saves that don't touch searchable fields"""
+    if update_fields and not {'title', 'excerpt', 'content'} & set(update_fields):
+        return
+    search.schedule_index(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: search.get_backend().remove([post_id]))
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def reindex_tagged_post(sender, instance, **kwargs):
+    """Tag names are part of the search document"""
+    if instance.content_type_id == ContentType.objects.get_for_model(Post).pk:
+        search.schedule_index(instance.object_id)
+
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def refresh_related_for_tags(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Post).pk:
+        related.schedule_refresh(instance.object_id)
+
+
+def _published_changed(instance):
+    """Whether the save just made went to or from published (see remember_published)"""
+    was_published = getattr(instance, '_was_published', None)
+    return was_published is not None and was_published != (instance.status == 'published')
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_for_status(sender, instance, **kwargs):
+    """Only published posts are listed as related; new posts have no tags yet"""
+    if _published_changed(instance):
+        related.schedule_refresh(instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def refresh_related_for_delete(sender, instance, **kwargs):
+    """Rows pointing at the post cascade away; refill the lists they were in"""
+    post_ids = list(RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True))
+    if post_ids:
+        transaction.on_commit(lambda: related.rebuild_for(post_ids))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_stats_for_tags(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == 'post_add':
+        tag_stats.tags_added(instance, pk_set)
+    elif action == 'post_remove':
+        tag_stats.tags_removed(instance, pk_set)
+    elif action == 'pre_clear':
+        tag_stats.tags_removed(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_published(sender, instance, update_fields=None, **kwargs):
+    # Never compare against a previous save's status
+    instance.__dict__.pop('_was_published', None)
+    if instance.pk is None or (update_fields and 'status' not in update_fields):
+        return
+    instance._was_published = Post.objects.filter(pk=instance.pk, status='published').exists()
+
+
+@receiver(post_save, sender=Post)
+def update_tag_stats_for_status(sender, instance, **kwargs):
+    if not _published_changed(instance):
+        return
+    if instance._was_published:
+        tag_stats.post_unpublished(instance)
+    else:
+        tag_stats.post_published(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def update_tag_stats_for_delete(sender, instance, **kwargs):
+    """The cascade to the post's tags doesn't send m2m_changed"""
+    if instance.status == 'published':
+        tag_stats.post_unpublished(instance)
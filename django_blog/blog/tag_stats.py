@@ -0,0 +1,131 @@
+"""
+Maintained tag statistics.
+
+TagStats holds the number of published posts per tag and TagCooccurrence
+the number of published posts per pair of tags (both directions, only
+pairs that occur). Both are updated in place, in the same transaction,
+whenever a published post's tags change or a post is published,
+unpublished or deleted (see signals.py), so the tag cloud and "related
+tags" are single indexed reads.
+
+Tag changes arrive through taggit's m2m_changed signal; tags assigned by
+writing TaggedItem rows directly aren't seen, and
+`manage.py rebuild_tag_stats` recomputes everything from scratch.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from taggit.models import TaggedItem
+
+from .models import Post, TagCooccurrence, TagStats
+
+BATCH_SIZE = 500
+
+
+def _tag_ids(post):
+    return set(
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post), object_id=post.pk
+        ).values_list('tag_id', flat=True)
+    )
+
+
+def _apply(tag_ids, others, delta):
+    """
+    Add delta to the counts of tag_ids and to every pair they form with
+    each other and with others (the post's tags that didn't change)
+    """
+    tag_ids, others = set(tag_ids), set(others) - set(tag_ids)
+    if not tag_ids:
+        return
+    partners = tag_ids | others
+    pairs = (
+        TagCooccurrence.objects
+        .filter(Q(tag_id__in=tag_ids, other_id__in=partners) | Q(tag_id__in=others, other_id__in=tag_ids))
+        .exclude(tag_id=F('other_id'))
+    )
+    stats = TagStats.objects.filter(tag_id__in=tag_ids)
+    if delta > 0:
+        TagStats.objects.bulk_create([TagStats(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True)
+        TagCooccurrence.objects.bulk_create(
+            [TagCooccurrence(tag_id=tag_id, other_id=other_id) for tag_id in tag_ids for other_id in partners
+             if tag_id != other_id]
+            + [TagCooccurrence(tag_id=other_id, other_id=tag_id) for other_id in others for tag_id in tag_ids],
+            ignore_conflicts=True,
+        )
+        stats.update(post_count=F('post_count') + delta)
+        pairs.update(post_count=F('post_count') + delta)
+    else:
+        stats.filter(post_count__gt=0).update(post_count=F('post_count') + delta)
+        pairs.filter(post_count__gt=0).update(post_count=F('post_count') + delta)
+        # Keep the pair table sparse; tag rows stay, a tag is usually reused
+        pairs.filter(post_count=0).delete()
+
+
+def tags_added(post, tag_ids):
+    if post.status == 'published':
+        _apply(tag_ids, _tag_ids(post), 1)
+
+
+def tags_removed(post, tag_ids=None):
+    """tag_ids=None removes all of the post's current tags (clear())"""
+    if post.status == 'published':
+        current = _tag_ids(post)
+        _apply(current if tag_ids is None else tag_ids, current, -1)
+
+
+def post_published(post):
+    _apply(_tag_ids(post), (), 1)
+
+
+def post_unpublished(post):
+    _apply(_tag_ids(post), (), -1)
+
+
+def rebuild():
+    """Recompute both tables from the tagged posts; returns the number of tags counted"""
+    content_type = ContentType.objects.get_for_model(Post)
+    published = Post.objects.filter(status='published').values('pk')
+    counts = (
+        TaggedItem.objects.filter(content_type=content_type, object_id__in=published)
+        .values('tag_id').annotate(n=Count('id')).values_list('tag_id', 'n')
+    )
+    tagged = TaggedItem._meta.db_table
+    with transaction.atomic():
+        TagStats.objects.all().delete()
+        TagCooccurrence.objects.all().delete()
+        stats = [TagStats(tag_id=tag_id, post_count=n) for tag_id, n in counts]
+        TagStats.objects.bulk_create(stats, batch_size=BATCH_SIZE)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT a.tag_id, b.tag_id, COUNT(*) FROM {tagged} a "
+                f"JOIN {tagged} b ON b.object_id = a.object_id AND b.content_type_id = a.content_type_id "
+                f"AND b.tag_id <> a.tag_id "
+                f"JOIN {Post._meta.db_table} p ON p.id = a.object_id AND p.status = 'published' "
+                f"WHERE a.content_type_id = %s "
+                f"GROUP BY a.tag_id, b.tag_id",
+                [content_type.pk],
+            )
+            TagCooccurrence.objects.bulk_create(
+                [TagCooccurrence(tag_id=tag_id, other_id=other_id, post_count=n)
+                 for tag_id, other_id, n in cursor.fetchall()],
+                batch_size=BATCH_SIZE,
+            )
+    return len(stats)
+
+
+def tag_cloud(limit=None):
+    """Tags with published posts, most used first, with num_posts set"""
+    entries = TagStats.objects.filter(post_count__gt=0).select_related('tag').order_by('-post_count', 'tag__name')
+    entries = list(entries[:limit] if limit else entries)
+    for entry in entries:
+        entry.tag.num_posts = entry.post_count
+    return [entry.tag for entry in entries]
+
+
+def related_tags(tag, limit=10):
+    """Tags most often used together with tag, with num_posts (shared posts) set"""
+    entries = list(TagCooccurrence.objects.filter(tag=tag).select_related('other').order_by('-post_count')[:limit])
+    for entry in entries:
+        entry.other.num_posts = entry.post_count
+    return [entry.other for entry in entries]
@@ -0,0 +1,283 @@
+"""
+Performance Features Test Script
+"""
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from taggit.models import Tag
+
+from blog import related, search, sidebar, tag_stats
+from blog.models import Comment, Post
+from blog.view_counter import counter, record_view
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        """Set up test users and data"""
+        self.factory = RequestFactory()
+        self.author = User.objects.create_user(username='author', password='authorpass123')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='This is a test post content.',
+            author=self.author,
+            status='published'
+        )
+        counter.flush()
+        cache.clear()
+
+    def request_from(self, ip):
+        request = self.factory.get('/')
+        request.META['REMOTE_ADDR'] = ip
+        return request
+
+    @override_settings(BLOG_VIEW_COUNT_DEDUP_WINDOW=0, BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_views_are_buffered_and_flushed_in_one_update(self):
+        """Test views are only written on flush, as a single UPDATE"""
+        for _ in range(5):
+            record_view(self.post)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(counter.flush(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 5)
+
+    @override_settings(BLOG_VIEW_COUNT_DEDUP_WINDOW=60, BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_repeat_views_are_deduplicated(self):
+        """Test the same visitor is counted once per window"""
+        self.assertTrue(record_view(self.post, self.request_from('10.0.0.1')))
+        self.assertFalse(record_view(self.post, self.request_from('10.0.0.1')))
+        self.assertTrue(record_view(self.post, self.request_from('10.0.0.2')))
+        counter.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    @override_settings(BLOG_VIEW_COUNT_DEDUP_WINDOW=0, BLOG_VIEW_COUNT_MAX_PENDING=2,
+                       BLOG_VIEW_COUNT_FLUSH_INTERVAL=3600)
+    def test_failed_flush_keeps_views_and_page_view_succeeds(self):
+        """Test a flush error inside record() is logged and the views retried"""
+        record_view(self.post)
+        with mock.patch('django.db.models.QuerySet.update', side_effect=DatabaseError('down')), \
+                self.assertLogs('blog.view_counter', 'ERROR'):
+            self.assertTrue(record_view(self.post))
+        self.assertEqual(counter.pending_total, 2)
+        self.assertEqual(counter.flush(), 2)
+        self.assertEqual(counter.pending_total, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+
+class SidebarTests(TestCase):
+    def setUp(self):
+        """Set up test users and data"""
+        self.author = User.objects.create_user(username='author', password='authorpass123')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='This is a test post content.',
+            author=self.author,
+            status='published'
+        )
+        cache.clear()
+
+    def test_sidebar_is_cached(self):
+        """Test the widgets are computed once and then served from cache"""
+        sidebar.get_sidebar_context()
+        with self.assertNumQueries(0):
+            context = sidebar.get_sidebar_context()
+        self.assertEqual(context['popular_posts'], [self.post])
+
+    def test_new_comment_marks_sidebar_stale(self):
+        """Test saving a comment keeps serving the cached widgets until they are recomputed"""
+        self.assertEqual(sidebar.get_sidebar_context()['recent_comments'], [])
+        comment = Comment.objects.create(post=self.post, author=self.author, content='Nice post')
+        self.assertEqual(cache.get(sidebar.CACHE_KEY)['fresh_until'], 0)
+
+        cache.add(sidebar.LOCK_KEY, 1)  # keep the background refresh out of the test transaction
+        with self.assertNumQueries(0):
+            self.assertEqual(sidebar.get_sidebar_context()['recent_comments'], [])
+        self.assertEqual(sidebar.refresh()['recent_comments'], [comment])
+
+    def test_popular_tags_count_published_posts_only(self):
+        """Test popular tags agree with the tag cloud"""
+        draft = Post.objects.create(title='Draft', content='Draft', author=self.author, status='draft')
+        draft.tags.add('django', 'drafts')
+        self.post.tags.add('django')
+        tags = sidebar.refresh()['popular_tags']
+        self.assertEqual([(tag.name, tag.num_posts) for tag in tags], [('django', 1)])
+
+
+class SearchTests(TransactionTestCase):
+    """Index updates run on commit, so these tests need real transactions"""
+
+    def setUp(self):
+        """Set up test users and data"""
+        self.author = User.objects.create_user(username='author', password='authorpass123')
+        self.post = Post.objects.create(
+            title='Caching in Django',
+            content='Use the <b>cache</b> framework to speed up views.',
+            author=self.author,
+            status='published'
+        )
+        self.other = Post.objects.create(
+            title='Cooking',
+            content='Recipes for pasta.',
+            author=self.author,
+            status='published'
+        )
+        self.published = Post.objects.filter(status='published')
+
+    def test_search_matches_title_and_content(self):
+        """Test matching posts are returned and others are not"""
+        self.assertEqual(list(search.search_posts(self.published, 'django')), [self.post])
+        self.assertEqual(list(search.search_posts(self.published, 'pasta')), [self.other])
+
+    def test_tag_changes_are_indexed(self):
+        """Test adding and removing a tag updates the search document"""
+        self.other.tags.add('italian')
+        self.assertEqual(list(search.search_posts(self.published, 'italian')), [self.other])
+        self.other.tags.remove('italian')
+        self.assertEqual(list(search.search_posts(self.published, 'italian')), [])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        """Test snippets mark the matched term without trusting post HTML"""
+        posts = search.attach_snippets(search.search_posts(self.published, 'framework'), 'framework')
+        self.assertIn('<mark>framework</mark>', posts[0].search_snippet)
+        self.assertIn('&lt;b&gt;', posts[0].search_snippet)
+
+    def test_title_only_match_gets_snippet(self):
+        """Test a match in the title alone is still highlighted"""
+        posts = search.attach_snippets(search.search_posts(self.published, 'cooking'), 'cooking')
+        self.assertIn('<mark>Cooking</mark>', posts[0].search_snippet)
+
+    @skipUnless(connection.vendor == 'sqlite', 'writes the FTS5 table directly')
+    def test_rebuild_drops_documents_of_deleted_posts(self):
+        """Test a rebuild reindexes every post and removes stale documents"""
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM blog_post_fts")
+            cursor.execute("INSERT INTO blog_post_fts (rowid, title) VALUES (%s, 'stale')", [self.other.pk + 100])
+        self.assertEqual(search.get_backend().rebuild(), 2)
+        self.assertEqual(list(search.search_posts(self.published, 'pasta')), [self.other])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM blog_post_fts")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class RelatedPostsTests(TransactionTestCase):
+    """Related lists are refreshed on commit, so these tests need real transactions"""
+
+    def setUp(self):
+        """Set up test users and data"""
+        self.author = User.objects.create_user(username='author', password='authorpass123')
+        self.posts = {}
+        for title in ('post', 'close', 'distant', 'draft', 'unrelated'):
+            self.posts[title] = Post.objects.create(
+                title=title,
+                content='Content.',
+                author=self.author,
+                status='draft' if title == 'draft' else 'published'
+            )
+        self.posts['post'].tags.add('django', 'python', 'caching')
+        self.posts['close'].tags.add('django', 'python')
+        self.posts['distant'].tags.add('python', 'snakes', 'zoo')
+        self.posts['draft'].tags.add('django', 'python', 'caching')
+        self.posts['unrelated'].tags.add('cooking')
+
+    def test_related_posts_are_ranked_by_tag_overlap(self):
+        """Test drafts and posts without shared tags are left out"""
+        self.assertEqual(
+            related.related_posts(self.posts['post']),
+            [self.posts['close'], self.posts['distant']]
+        )
+        self.assertEqual(related.related_posts(self.posts['unrelated']), [])
+
+    def test_tag_changes_refresh_neighbours(self):
+        """Test a tag change updates the post's list and the lists it appears in"""
+        self.posts['unrelated'].tags.add('django', 'python', 'caching')
+        self.assertEqual(related.related_posts(self.posts['post'])[0], self.posts['unrelated'])
+        self.posts['unrelated'].tags.set(['cooking'])
+        self.assertNotIn(self.posts['unrelated'], related.related_posts(self.posts['post']))
+        self.assertEqual(related.related_posts(self.posts['unrelated']), [])
+
+    def test_unpublishing_removes_post_from_lists(self):
+        """Test a post that goes back to draft is no longer listed"""
+        self.posts['close'].status = 'draft'
+        self.posts['close'].save()
+        self.assertEqual(related.related_posts(self.posts['post']), [self.posts['distant']])
+
+    def test_saves_without_status_change_skip_refresh(self):
+        """Test editing a published post leaves the related lists alone"""
+        self.posts['close'].title = 'Edited'
+        with CaptureQueriesContext(connection) as queries:
+            self.posts['close'].save()
+        self.assertFalse(any('blog_relatedpost' in query['sql'] for query in queries.captured_queries))
+
+    @override_settings(BLOG_RELATED_POSTS_MAX_FANOUT=1)
+    def test_fan_out_is_capped(self):
+        """Test only the best-scoring neighbour list is refreshed inline"""
+        with transaction.atomic():
+            self.posts['unrelated'].tags.set(['django', 'python', 'caching'])
+        self.assertEqual(related.related_posts(self.posts['draft'])[0], self.posts['unrelated'])
+        self.assertNotIn(self.posts['unrelated'], related.related_posts(self.posts['post']))
+        related.rebuild()
+        self.assertEqual(related.related_posts(self.posts['post'])[0], self.posts['unrelated'])
+
+    def test_detail_page_reads_stored_rows(self):
+        """Test the detail view shows the stored related posts"""
+        self.addCleanup(counter.flush)  # the page view is buffered; write it while the tables exist
+        response = self.client.get(reverse('post_detail', args=[self.posts['post'].pk]))
+        self.assertEqual(list(response.context['related_posts']), [self.posts['close'], self.posts['distant']])
+
+
+class TagStatsTests(TestCase):
+    def setUp(self):
+        """Set up test users and data"""
+        self.author = User.objects.create_user(username='author', password='authorpass123')
+        self.post = Post.objects.create(title='One', content='Content.', author=self.author, status='published')
+        self.other = Post.objects.create(title='Two', content='Content.', author=self.author, status='published')
+        self.post.tags.add('django', 'python')
+        self.other.tags.add('django', 'caching')
+
+    def counts(self):
+        return {tag.name: tag.num_posts for tag in tag_stats.tag_cloud()}
+
+    def related(self, name):
+        return {tag.name: tag.num_posts for tag in tag_stats.related_tags(Tag.objects.get(name=name))}
+
+    def test_counts_and_cooccurrences_follow_tag_changes(self):
+        """Test adding and removing tags updates both tables"""
+        self.assertEqual(self.counts(), {'django': 2, 'python': 1, 'caching': 1})
+        self.assertEqual(self.related('django'), {'python': 1, 'caching': 1})
+        self.other.tags.set(['python'])
+        self.assertEqual(self.counts(), {'django': 1, 'python': 2})
+        self.assertEqual(self.related('python'), {'django': 1})
+        self.assertEqual(self.related('caching'), {})
+
+    def test_only_published_posts_are_counted(self):
+        """Test unpublishing, drafts and deletion update the counts"""
+        self.other.status = 'draft'
+        self.other.save()
+        self.other.tags.add('drafts')
+        self.assertEqual(self.counts(), {'django': 1, 'python': 1})
+        self.post.delete()
+        self.assertEqual(self.counts(), {})
+        self.other.status = 'published'
+        self.other.save()
+        self.assertEqual(self.counts(), {'django': 1, 'caching': 1, 'drafts': 1})
+
+    def test_rebuild_matches_incremental_updates(self):
+        """Test a full rebuild produces the same statistics"""
+        self.post.tags.clear()
+        before = (self.counts(), self.related('django'))
+        tag_stats.rebuild()
+        self.assertEqual((self.counts(), self.related('django')), before)
+
+    def test_tag_cloud_is_one_query(self):
+        """Test the tag cloud is served from the statistics table"""
+        with self.assertNumQueries(1):
+            tag_stats.tag_cloud()
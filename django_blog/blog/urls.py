@@ -1,5 +1,5 @@
 """
-URL configuration for django_blog project.
+URL configuration for the blog app (included by django_blog/urls.py).
 
 The `urlpatterns` list routes URLs to views. For more information please see:
     https://docs.djangoproject.com/en/4.2/topics/http/urls/
@@ -14,78 +14,68 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
+from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
+from .forms import CustomAuthenticationForm
 from .views import (
-    PostListView, PostDetailView, PostCreateView, 
+    PostListView, PostDetailView, PostCreateView,
     PostUpdateView, PostDeleteView, RegisterView,
     ProfileView, ProfileUpdateView, UserPostsView,
-    UserCommentsView
+    UserCommentsView, DraftListView, UserPostListView
 )
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('', include('blog.urls')),  # Blog app URLs
-    path('accounts/', include('django.contrib.auth.urls')),  # Authentication URLs
-    path('', views.PostListView.as_view(), name='home'),
-    path('post/<int:pk>/', views.PostDetailView.as_view(), name='post_detail'),
-    path('post/new/', views.PostCreateView.as_view(), name='post_create'),
-    path('post/<int:pk>/update/', views.PostUpdateView.as_view(), name='post_update'),
-    path('post/<int:pk>/delete/', views.PostDeleteView.as_view(), name='post_delete'),
-    path('search/', views.search_posts, name='search'),
-
-     # Core blog URLs
+    # Core blog URLs
     path('', PostListView.as_view(), name='home'),
     path('posts/', PostListView.as_view(), name='post_list'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
     path('post/<int:pk>/<slug:slug>/', PostDetailView.as_view(), name='post_detail_slug'),
-    
+
     # CRUD Operations
     path('post/new/', PostCreateView.as_view(), name='post_create'),
     path('post/<int:pk>/edit/', PostUpdateView.as_view(), name='post_edit'),
+    path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post_update'),
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post_delete'),
-    
+
     # User-specific views
     path('posts/drafts/', DraftListView.as_view(), name='post_drafts'),
     path('user/<str:username>/posts/', UserPostListView.as_view(), name='user_posts'),
-    
+
     # Post interactions
     path('post/<int:pk>/like/', views.post_like_view, name='post_like'),
     path('post/<int:pk>/comment/', views.add_comment, name='add_comment'),
-    path('comment/<int:pk>/delete/', views.delete_comment, name='delete_comment'),
-    
-    # Comment URLs
-    path('post/<int:pk>/comment/', views.add_comment, name='add_comment'),
-    path('comment/<int:pk>/edit/', views.edit_comment, name='edit_comment'),
-    path('comment/<int:pk>/delete/', views.delete_comment, name='delete_comment'),
-
 
     # Comment URLs using class-based views
-    path('post/<int:post_id>/comment/new/', 
-         views.CommentCreateView.as_view(), 
+    path('post/<int:post_id>/comment/new/',
+         views.CommentCreateView.as_view(),
          name='comment_create'),
-    path('comment/<int:pk>/update/', 
-        views= post/<int:pk>/comments/new/()
-         name= 'comment_update')
-    path('comment/<int:pk>/edit/', 
-         views.CommentUpdateView.as_view(), 
-         name='comment_edit'),
-    path('comment/<int:pk>/delete/', 
-         views.CommentDeleteView.as_view(), 
+    path('comment/<int:pk>/edit/',
+         views.CommentUpdateView.as_view(),
+         name='edit_comment'),
+    path('comment/<int:pk>/update/',
+         views.CommentUpdateView.as_view(),
+         name='comment_update'),
+    path('comment/<int:pk>/delete/', views.delete_comment, name='delete_comment'),
+    path('comment/<int:pk>/delete/',
+         views.CommentDeleteView.as_view(),
          name='comment_delete'),
-    
-    # Search
+
+    # Tag and Search URLs
     path('search/', views.search_posts, name='search'),
-    
+    path('tags/', views.tag_cloud, name='tag_cloud'),
+    path('tags/<slug:tag_slug>/', views.posts_by_tag, name='posts_by_tag'),
+
     # Authentication URLs
     path('register/', RegisterView.as_view(), name='register'),
-    path('login/', views.custom_login_view, name='login'),
+    path('login/',
+         auth_views.LoginView.as_view(
+             template_name='blog/login.html',
+             authentication_form=CustomAuthenticationForm
+         ),
+         name='login'),
     path('logout/', views.custom_logout_view, name='logout'),
-    
+
     # Profile URLs
     path('profile/', ProfileView.as_view(), name='profile'),
     path('profile/edit/', ProfileUpdateView.as_view(), name='profile_edit'),
@@ -94,70 +84,27 @@ urlpatterns = [
     path('profile/comments/', UserCommentsView.as_view(), name='user_comments'),
     path('profile/delete-account/', views.delete_account_view, name='delete_account'),
 
-    # Tag and Search URLs
-    path('search/', views.search_posts, name='search'),
-    path('tags/', views.tag_cloud, name='tag_cloud'),
-    path('tags/<slug:tag_slug>/', views.posts_by_tag, name='posts_by_tag'),
-    
- # Password reset URLs
-    path('password-reset/', 
-         auth_views.PasswordResetView.as_view(
-             template_name='blog/password_reset.html',
-             email_template_name='blog/password_reset_email.html',
-             subject_template_name='blog/password_reset_subject.txt'
-         ), 
-         name='password_reset'),
-    path('password-reset/done/', 
-         auth_views.PasswordResetDoneView.as_view(
-             template_name='blog/password_reset_done.html'
-         ), 
-         name='password_reset_done'),
-    path('password-reset-confirm/<uidb64>/<token>/', 
-         auth_views.PasswordResetConfirmView.as_view(
-             template_name='blog/password_reset_confirm.html'
-         ), 
-         name='password_reset_confirm'),
-    path('password-reset-complete/', 
-         auth_views.PasswordResetCompleteView.as_view(
-             template_name='blog/password_reset_complete.html'
-         ), 
-         name='password_reset_complete'),
-
-    # Comment URLs
-    path('post/<int:pk>/comment/', views.add_comment, name='add_comment'),
-    
     # Password reset URLs (using Django's built-in views)
-    path('password-reset/', 
+    path('password-reset/',
          auth_views.PasswordResetView.as_view(
              template_name='blog/password_reset.html',
              email_template_name='blog/password_reset_email.html',
              subject_template_name='blog/password_reset_subject.txt'
-         ), 
+         ),
          name='password_reset'),
-    path('password-reset/done/', 
+    path('password-reset/done/',
          auth_views.PasswordResetDoneView.as_view(
              template_name='blog/password_reset_done.html'
-         ), 
+         ),
          name='password_reset_done'),
-    path('password-reset-confirm/<uidb64>/<token>/', 
+    path('password-reset-confirm/<uidb64>/<token>/',
          auth_views.PasswordResetConfirmView.as_view(
              template_name='blog/password_reset_confirm.html'
-         ), 
+         ),
          name='password_reset_confirm'),
-    path('password-reset-complete/', 
+    path('password-reset-complete/',
          auth_views.PasswordResetCompleteView.as_view(
              template_name='blog/password_reset_complete.html'
-         ), 
+         ),
          name='password_reset_complete'),
-         (PostByTagListView.as_view())
-]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns = [
-    path('admin/', admin.site.urls),
 ]
-
-
-
@@ -0,0 +1,133 @@
+"""
+Buffered post view counter.
+
+Page views are accumulated in memory per process and written out as
+batched `views = views + n` UPDATEs (one per distinct n) at most every
+BLOG_VIEW_COUNT_FLUSH_INTERVAL seconds, or sooner once
+BLOG_VIEW_COUNT_MAX_PENDING views are waiting. A daemon thread, started
+with the first view in each process, also flushes every interval, so a
+process that goes quiet doesn't sit on its views. Anything still buffered
+is flushed at interpreter exit. A failed flush is logged and its views
+are kept for the next one; it never fails the page view that triggered it.
+
+With BLOG_VIEW_COUNT_DEDUP_WINDOW set, repeat views of a post from the
+same session (or IP address, for visitors without a session) within that
+many seconds are not counted. Dedup markers live in the cache, so they
+are shared between processes when the cache is.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ViewCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)  # post id -> views not yet written
+        self.pending_total = 0
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    def record(self, post_id, count=1):
+        with self.lock:
+            self.pending[post_id] += count
+            self.pending_total += count
+            due = (
+                self.pending_total >= _setting('BLOG_VIEW_COUNT_MAX_PENDING', 1000)
+                or time.monotonic() - self.last_flush >= _setting('BLOG_VIEW_COUNT_FLUSH_INTERVAL', 10)
+            )
+            self._start_timer()
+        if due:
+            self._flush_logged()
+
+    def _start_timer(self):
+        # Threads don't survive a fork, so each worker process starts its own
+        if self.timer is None or not self.timer.is_alive():
+            self.timer = threading.Thread(target=self._run_timer, name='view-counter-flush', daemon=True)
+            self.timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(_setting('BLOG_VIEW_COUNT_FLUSH_INTERVAL', 10))
+            self._flush_logged()
+            # This thread's connection would otherwise stay open between flushes
+            connections.close_all()
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("View count flush failed")
+
+    def pending_for(self, post_id):
+        with self.lock:
+            return self.pending.get(post_id, 0)
+
+    def flush(self):
+        """Write buffered views; returns the number of views written"""
+        from .models import Post
+
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            self.pending_total = 0
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        # Posts with the same increment share one UPDATE
+        by_increment = defaultdict(list)
+        for post_id, count in pending.items():
+            by_increment[count].append(post_id)
+        try:
+            for count, post_ids in by_increment.items():
+                Post.objects.filter(pk__in=post_ids).update(views=F('views') + count)
+        except Exception:
+            # Keep the views for the next flush rather than dropping them
+            with self.lock:
+                for post_id, count in pending.items():
+                    self.pending[post_id] += count
+                    self.pending_total += count
+            raise
+        return sum(pending.values())
+
+
+counter = ViewCounter()
+atexit.register(counter.flush)
+
+
+def _viewer(request):
+    session_key = getattr(getattr(request, 'session', None), 'session_key', None)
+    if session_key:
+        return f'session:{session_key}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def first_view(post_id, request):
+    """False if this viewer already viewed the post within the dedup window"""
+    window = _setting('BLOG_VIEW_COUNT_DEDUP_WINDOW', 0)
+    if not window or request is None:
+        return True
+    viewer = hashlib.sha256(_viewer(request).encode()).hexdigest()[:32]
+    return cache.add(f'blog:viewed:{post_id}:{viewer}', 1, window)
+
+
+def record_view(post, request=None):
+    """Count a view of the post; returns True if it was counted"""
+    if not first_view(post.pk, request):
+        return False
+    counter.record(post.pk)
+    return True
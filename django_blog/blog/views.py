@@ -6,7 +6,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.db.models import Q, Count, F
+from django.db.models import Count, F
 from django.urls import reverse_lazy
 from django.core.paginator import Paginator
 from django.http import JsonResponse, HttpResponseForbidden
@@ -16,13 +16,15 @@ from django.db import transaction
 from taggit.models import Tag
 from django.core.exceptions import PermissionDenied
 from .models import Post, Comment, UserProfile
+from .sidebar import SidebarMixin, get_sidebar_context
+from . import related, search, tag_stats
 from .forms import (
     CustomUserCreationForm, CustomAuthenticationForm, 
     UserProfileForm, PasswordChangeCustomForm, 
-    PostForm, CommentForm, SearchForm)
+    PostForm, CommentForm, CommentEditForm, SearchForm)
 # Create your views here.
 
-class PostListView(ListView):
+class PostListView(SidebarMixin, ListView):
     """Display all published blog posts with filtering"""
     model = Post
     template_name = 'blog/post_list.html'
@@ -46,12 +48,7 @@ class PostListView(ListView):
         # Search functionality
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(content__icontains=search_query) |
-                Q(excerpt__icontains=search_query) |
-                Q(tags__name__icontains=search_query)
-            ).distinct()
+            queryset = search.search_posts(queryset, search_query)
         
         # Annotate with comment count
         queryset = queryset.annotate(comment_count=Count('comments'))
@@ -59,25 +56,14 @@ class PostListView(ListView):
         return queryset
     
     def get_context_data(self, **kwargs):
+        # Popular tags, recent comments and popular posts come from SidebarMixin (cached)
         context = super().get_context_data(**kwargs)
         
-        # Get popular tags
-        context['popular_tags'] = Tag.objects.annotate(
-            num_posts=Count('taggit_taggeditem_items')
-        ).order_by('-num_posts')[:10]
-        
-        # Get recent comments
-        context['recent_comments'] = Comment.objects.filter(
-            approved=True
-        ).select_related('author', 'post').order_by('-created_date')[:5]
-        
-        # Get popular posts (most viewed)
-        context['popular_posts'] = Post.objects.filter(
-            status='published'
-        ).order_by('-views')[:5]
-        
         # Search form
         context['search_form'] = PostSearchForm(self.request.GET or None)
+        search_query = self.request.GET.get('q')
+        if search_query:
+            search.attach_snippets(context['posts'], search_query)
         
         # Add filter info
         tag_slug = self.request.GET.get('tag')
@@ -90,7 +76,7 @@ class PostListView(ListView):
         
         return context
 
-class PostDetailView(DetailView):
+class PostDetailView(SidebarMixin, DetailView):
     """Display individual blog post with comments"""
     model = Post
     template_name = 'blog/post_detail.html'
@@ -101,35 +87,20 @@ class PostDetailView(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        context['comments'] = post.comments.all().order_by('created_at')
-        context['comment_form'] = CommentForm()
-        
-        post_tags_ids = post.tags.values_list('id', flat=True)
-        related_posts = Post.objects.filter(
-            status='published',
-            tags__in=post_tags_ids
-        ).exclude(pk=post.pk).distinct()[:3]
+        post = self.object
         
         context.update({
-            'related_posts': related_posts,
             'search_form': SearchForm(),
         })
 
-        # Increment view count
-        post.increment_views()
+        # Count the view (buffered; repeat views may be deduplicated)
+        post.increment_views(self.request)
         
-        # Get approved comments with replies
-        comments = post.comments.filter(
-            approved=True, 
-            parent__isnull=True
-        ).select_related('author').prefetch_related('replies')
+        # Approved comments
+        comments = post.comments.filter(approved=True).select_related('author')
         
-        # Get related posts (same tags)
-        related_posts = Post.objects.filter(
-            status='published',
-            tags__in=post.tags.all()
-        ).exclude(pk=post.pk).distinct()[:3]
+        # Related posts (most shared tags) are precomputed, see related.py
+        related_posts = related.related_posts(post)
         
         context.update({
             'comments': comments,
@@ -383,17 +354,15 @@ def search_posts(request):
     if form.is_valid():
         query = form.cleaned_data.get('query', '')
         if query:
-            # Search in title, content, and tags
-            posts = posts.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query) |
-                Q(tags__name__icontains=query)
-            ).distinct().order_by('-published_date')
+            # Full-text search over title, tags, excerpt and content, best match first
+            posts = search.search_posts(posts, query).select_related('author')
     
     # Pagination
     paginator = Paginator(posts, 10)  # Show 10 posts per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    if query:
+        search.attach_snippets(page_obj.object_list, query)
     
     context = {
         'form': form,
@@ -401,6 +370,7 @@ def search_posts(request):
         'query': query,
         'search_performed': bool(query),
         'total_results': posts.count(),
+        **get_sidebar_context(),
     }
     return render(request, 'blog/search_results.html', context)
 
@@ -417,32 +387,27 @@ def posts_by_tag(request, tag_slug):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Get related tags (tags that appear with this tag)
-    post_ids = posts.values_list('id', flat=True)
-    related_tags = Tag.objects.filter(
-        blog_post__id__in=post_ids
-    ).exclude(slug=tag_slug).annotate(
-        num_posts=models.Count('taggit_taggeditem_items')
-    ).order_by('-num_posts')[:10]
+    # Related tags (most often used together with this tag) come from tag_stats.py
+    related_tags = tag_stats.related_tags(tag)
     
     context = {
         'tag': tag,
         'posts': page_obj,
         'related_tags': related_tags,
         'total_posts': posts.count(),
+        **get_sidebar_context(),
     }
     return render(request, 'blog/posts_by_tag.html', context)
 
 def tag_cloud(request):
     """Display all tags as a tag cloud"""
-    tags = Tag.objects.all().annotate(
-        num_posts=models.Count('taggit_taggeditem_items')
-    ).order_by('-num_posts')
+    # Published post counts are maintained in tag_stats.py, most used first
+    tags = tag_stats.tag_cloud()
     
     # Calculate tag size for cloud display
     if tags:
         max_count = tags[0].num_posts
-        min_count = tags.last().num_posts
+        min_count = tags[-1].num_posts
         for tag in tags:
             if max_count != min_count:
                 size = 10 + ((tag.num_posts - min_count) / (max_count - min_count)) * 20
@@ -455,6 +420,18 @@ def tag_cloud(request):
     }
     return render(request, 'blog/tag_cloud.html', context)
 
+class RegisterView(FormView):
+    """User registration; signs the new user in"""
+    form_class = CustomUserCreationForm
+    template_name = 'blog/register.html'
+    success_url = reverse_lazy('home')
+
+    def form_valid(self, form):
+        user = form.save()
+        login(self.request, user)
+        messages.success(self.request, f'Welcome, {user.username}! Your account has been created.')
+        return super().form_valid(form)
+
 @login_required
 def custom_logout_view(request):
     """Custom logout view with confirmation message"""
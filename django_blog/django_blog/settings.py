@@ -38,7 +38,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'Blog',
     'blog.apps.BlogConfig',  # Main blog app
     'taggit',
 ]
@@ -84,16 +83,18 @@ DATABASES = {
     }
 }
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'blogdb',
-        'USER': 'bloguser',
-        'PASSWORD': 'yourpassword',
-        'HOST': 'localhost',
-        'PORT': '5432',
+# PostgreSQL when configured (enables the tsvector search backend), e.g. POSTGRES_DB=blogdb
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', 'bloguser'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        }
     }
-}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -184,3 +185,23 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For developm
 # EMAIL_USE_TLS = True
 # EMAIL_HOST_USER = 'your-email@gmail.com'
 # EMAIL_HOST_PASSWORD = 'your-password'
+
+# Post view counts are buffered per process and written in batches
+BLOG_VIEW_COUNT_FLUSH_INTERVAL = 10  # seconds
+BLOG_VIEW_COUNT_MAX_PENDING = 1000
+BLOG_VIEW_COUNT_DEDUP_WINDOW = 30 * 60  # seconds; 0 counts every page view
+
+# Sidebar widgets (blog/sidebar.py): fresh for TTL seconds, then served
+# stale for up to STALE_TTL more while one worker recomputes them
+BLOG_SIDEBAR_TTL = 300
+BLOG_SIDEBAR_STALE_TTL = 600
+
+# Full-text search (blog/search.py). Picked from the database vendor by
+# default; set a dotted path to override, e.g.
+# 'blog.search.IcontainsSearchBackend'
+BLOG_SEARCH_BACKEND = None
+
+# Related posts stored per post (blog/related.py), ranked by shared tags
+BLOG_RELATED_POSTS_K = 3
+# Most neighbour lists a single change refreshes inline; the rest wait for rebuild_related_posts
+BLOG_RELATED_POSTS_MAX_FANOUT = 200
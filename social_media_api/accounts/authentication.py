@@ -0,0 +1,131 @@
+"""
+Token authentication with a two-level cache for token -> user resolution:
+a per-process LRU (short TTL) in front of the shared Django cache. Entries
+are evicted when a token is deleted or re-saved and when its user is saved
+(e.g. deactivated); see signals.py. Other processes' LRUs may serve an
+evicted entry for up to AUTH_TOKEN_LOCAL_TTL seconds.
+
+The LRU keeps its own copy of each user and hands out a fresh copy per
+lookup, so attributes a request sets on request.user (e.g. the following
+set memo) never leak into other requests or threads.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _shared_key(token_key):
+    # Never put raw tokens in the shared cache
+    return 'auth:token:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def _detached(user):
+    """A copy of user without per-request memos"""
+    user = copy.copy(user)
+    user.__dict__.pop('_following_ids', None)
+    return user
+
+
+class LocalTokenCache:
+    """Thread-safe LRU with per-entry expiry; get() returns a copy of the stored user"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, token_key):
+        with self.lock:
+            entry = self.entries.get(token_key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self.entries[token_key]
+                return None
+            self.entries.move_to_end(token_key)
+        return _detached(user)
+
+    def set(self, token_key, user):
+        user = _detached(user)
+        with self.lock:
+            self.entries[token_key] = (user, time.monotonic() + _setting('AUTH_TOKEN_LOCAL_TTL', 30))
+            self.entries.move_to_end(token_key)
+            while len(self.entries) > _setting('AUTH_TOKEN_LOCAL_MAX_SIZE', 10000):
+                self.entries.popitem(last=False)
+
+    def evict(self, token_key):
+        with self.lock:
+            self.entries.pop(token_key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalTokenCache()
+
+_stats_lock = threading.Lock()
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    """Hit counters for this process, plus the overall hit rate"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = sum(snapshot.values())
+    hits = snapshot['local_hits'] + snapshot['shared_hits']
+    snapshot['lookups'] = lookups
+    snapshot['hit_rate'] = hits / lookups if lookups else 0.0
+    snapshot['local_size'] = len(local_cache.entries)
+    return snapshot
+
+
+def evict_token(token_key):
+    local_cache.evict(token_key)
+    cache.delete(_shared_key(token_key))
+
+
+def evict_user(user):
+    for token_key in Token.objects.filter(user=user).values_list('key', flat=True):
+        evict_token(token_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        user = local_cache.get(key)
+        if user is not None:
+            _record('local_hits')
+        else:
+            user = cache.get(_shared_key(key))
+            if user is not None:
+                _record('shared_hits')
+                local_cache.set(key, user)
+
+        if user is None:
+            _record('misses')
+            user, token = super().authenticate_credentials(key)
+            local_cache.set(key, user)
+            cache.set(_shared_key(key), user, _setting('AUTH_TOKEN_SHARED_TTL', 300))
+            return (user, token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # request.auth only needs to identify the token
+        return (user, Token(key=key, user=user))
@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import LazyObject, empty
+
+
+def _version_key(user_id):
+    return f'follow_graph:version:{user_id}'
+
+
+def _following_key(user_id, version):
+    return f'follow_graph:following:{user_id}:{version}'
+
+
+def _followers_version_key(user_id):
+    return f'follow_graph:followers_version:{user_id}'
+
+
+def _followers_key(user_id, version):
+    return f'follow_graph:followers:{user_id}:{version}'
+
+
+def _get_version(key):
+    # Seed with a timestamp so an evicted version never reuses an old number
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _version(user_id):
+    return _get_version(_version_key(user_id))
+
+
+def version(user):
+    """Changes whenever the set of users this user follows changes"""
+    return _version(user.pk)
+
+
+def followers_version(user):
+    """Changes whenever someone follows or unfollows this user"""
+    return _get_version(_followers_version_key(user.pk))
+
+
+def following_ids(user):
+    """
+    IDs of the users this user follows, from a versioned cache entry that
+    follow()/unfollow() invalidate. Memoized on the user instance;
+    FollowGraphMiddleware drops the memo from request.user when the
+    request ends, so it never outlives a request.
+    """
+    ids = getattr(user, '_following_ids', None)
+    if ids is not None:
+        return ids
+
+    key = _following_key(user.pk, _version(user.pk))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(user.followers.values_list('id', flat=True))
+        cache.set(key, ids, getattr(settings, 'FOLLOW_GRAPH_CACHE_TTL', 600))
+    user._following_ids = ids
+    return ids
+
+
+def follower_ids(user):
+    """IDs of the users following this user, cached per followers_version()"""
+    key = _followers_key(user.pk, followers_version(user))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(user.following_users.values_list('id', flat=True))
+        cache.set(key, ids, getattr(settings, 'FOLLOW_GRAPH_CACHE_TTL', 600))
+    return ids
+
+
+def is_following(user, other):
+    return other.pk in following_ids(user)
+
+
+def invalidate(user, others=()):
+    """Call after changing who the user follows; others are the users (or IDs) followed/unfollowed"""
+    _bump(_version_key(user.pk))
+    for other in others:
+        _bump(_followers_version_key(getattr(other, 'pk', other)))
+    forget(user)
+
+
+def forget(user):
+    """Drop the following_ids() memo from a user (or request.user's lazy wrapper)"""
+    if isinstance(user, LazyObject):
+        if user._wrapped is empty:
+            return
+        user = user._wrapped
+    user.__dict__.pop('_following_ids', None)
+
+
+class FollowGraphMiddleware:
+    """Keeps following_ids() memoization to a single request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            # DRF stores the user it authenticated back on the Django request
+            user = getattr(request, 'user', None)
+            if user is not None:
+                forget(user)
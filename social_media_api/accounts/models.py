@@ -1,17 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from . import graph
 
 # Create your models here.
 
 
-class CustomUser(AbstractUser):
-    bio = models.TextField(blank=True)
-    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True)
-    followers = models.ManyToManyField('self', symmetrical=False, blank=True)
-    
-    def __str__(self):
-        return self.username
-    
 class CustomUser(AbstractUser):
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True)
@@ -22,13 +15,23 @@ class CustomUser(AbstractUser):
     
     def follow(self, user):
         """Add a user to followers"""
+        from posts import timeline
+
         if user != self:
             self.followers.add(user)
+            graph.invalidate(self, [user])
+            timeline.followers_changed([user.pk], followed=True)
+            timeline.backfill(self, user)
     
     def unfollow(self, user):
         """Remove a user from followers"""
+        from posts import timeline
+
         self.followers.remove(user)
+        graph.invalidate(self, [user])
+        timeline.followers_changed([user.pk], followed=False)
+        timeline.purge(self, user)
     
     def is_following(self, user):
         """Check if following a user"""
-        return self.followers.filter(id=user.id).exists()
\ No newline at end of file
+        return graph.is_following(self, user)
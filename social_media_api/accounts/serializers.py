@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
 from .models import CustomUser
+from . import graph
 from rest_framework.authtoken.models import Token
 
 class UserSerializer(serializers.ModelSerializer):
@@ -31,6 +33,20 @@ class LoginSerializer(serializers.Serializer):
 class FollowSerializer(serializers.Serializer):
     user_id = serializers.IntegerField()
 
+class BulkFollowSerializer(serializers.Serializer):
+    """IDs and/or usernames (e.g. an imported follow list)"""
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+
+    def validate(self, attrs):
+        total = len(attrs['user_ids']) + len(attrs['usernames'])
+        if not total:
+            raise serializers.ValidationError('Provide user_ids or usernames.')
+        limit = getattr(settings, 'BULK_FOLLOW_MAX_USERS', 200)
+        if total > limit:
+            raise serializers.ValidationError(f'At most {limit} users per request.')
+        return attrs
+
 class UserProfileSerializer(serializers.ModelSerializer):
     is_following = serializers.SerializerMethodField()
     
@@ -41,7 +57,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     def get_is_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return request.user.is_following(obj)
+            return graph.is_following(request.user, obj)
 
         return False
 from rest_framework import serializers
@@ -99,7 +115,6 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         Token.objects.create(user=user)
         return user
- ["get_user_model().objects.create_user"]
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from social_media_api.conditional import bump
+from .authentication import evict_token, evict_user
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def evict_cached_token(sender, instance, **kwargs):
+    evict_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_cached_user(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached copies of the user (covers deactivation and profile edits)"""
+    if created or update_fields == frozenset(['last_login']):
+        return
+    evict_user(instance)
+    # Cached profile, post detail and follower-list pages that show this user
+    bump(f'user:{instance.pk}')
@@ -1,3 +1,142 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from . import authentication, graph
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.fan.follow(self.user)
+        token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def follows_back(self):
+        response = self.client.get(reverse('followers'), **self.auth)
+        return {entry['username']: entry['is_following'] for entry in response.data['results']}
+
+    def test_following_memo_does_not_outlive_the_request(self):
+        self.assertEqual(self.follows_back(), {'fan': False})
+        # A follow made elsewhere (another process) through a different instance
+        User.objects.get(pk=self.user.pk).follow(self.fan)
+        self.assertEqual(self.follows_back(), {'fan': True})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkFollowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        self.others = [User.objects.create_user(username=f'other{i}', password='pass12345') for i in range(3)]
+        token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def post(self, name, users):
+        return self.client.post(reverse(name), {'user_ids': [u.pk for u in users]},
+                                content_type='application/json', **self.auth)
+
+    def test_follow_reads_current_rows(self):
+        self.post('bulk_follow', self.others[:1])
+        graph.following_ids(self.user)  # cache the following set
+        # Unfollowed elsewhere without invalidating the cached set
+        User.followers.through.objects.filter(from_customuser=self.user).delete()
+        response = self.post('bulk_follow', self.others[:2])
+        self.assertEqual(sorted(response.data['followed']), [self.others[0].pk, self.others[1].pk])
+        self.assertEqual(response.data['already_following'], [])
+
+    def test_unfollowing_strangers_keeps_their_versions(self):
+        self.post('bulk_follow', self.others[:1])
+        before = [graph.followers_version(other) for other in self.others]
+        self.post('bulk_unfollow', self.others)
+        after = [graph.followers_version(other) for other in self.others]
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1:], before[1:])
+
+    def test_unfollow_reports_only_removed_follows(self):
+        self.post('bulk_follow', self.others[:2])
+        response = self.client.post(
+            reverse('bulk_unfollow'),
+            {'user_ids': [self.others[0].pk, self.others[2].pk, 999999], 'usernames': ['ghost']},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.data['unfollowed'], [self.others[0].pk])
+        self.assertEqual(response.data['not_following'], [self.others[2].pk])
+        self.assertEqual(response.data['not_found'], [999999, 'ghost'])
+        self.assertEqual(graph.following_ids(User.objects.get(pk=self.user.pk)), {self.others[1].pk})
+
+
+class LocalTokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        return authentication.CachedTokenAuthentication().authenticate_credentials(self.token.key)[0]
+
+    def test_each_request_gets_its_own_user(self):
+        first = self.authenticate()
+        graph.following_ids(first)
+        first.first_name = 'changed by a request'
+        second = self.authenticate()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.pk, self.user.pk)
+        self.assertNotIn('_following_ids', second.__dict__)
+        self.assertEqual(second.first_name, '')
+        self.assertGreater(authentication.stats()['local_hits'], 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowListETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        # Two pages of ten
+        self.others = [User.objects.create_user(username=f'other{i:02}', password='pass12345') for i in range(12)]
+        for other in self.others:
+            self.user.follow(other)
+        token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def etag(self):
+        return self.client.get(reverse('following'), **self.auth)['ETag']
+
+    def test_only_edits_to_listed_users_change_the_etag(self):
+        etag = self.etag()
+        self.others[-1].first_name = 'Second page'
+        self.others[-1].save()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.etag(), etag)
+
+        self.others[0].first_name = 'First page'
+        self.others[0].save()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_followers_page_does_not_load_every_follower(self):
+        fans = self.others[:3]
+        for fan in fans:
+            fan.follow(self.user)
+        url = reverse('followers')
+        with mock.patch.object(graph, 'follower_ids', side_effect=AssertionError("loads every follower")):
+            first = self.client.get(url, **self.auth)
+            self.assertEqual([row['username'] for row in first.data['results']], [f.username for f in fans])
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], **self.auth)
+            self.assertEqual(again.status_code, 304)
+
+            fans[1].first_name = 'Edited'
+            fans[1].save()
+            self.assertNotEqual(self.client.get(url, **self.auth)['ETag'], first['ETag'])
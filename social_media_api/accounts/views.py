@@ -1,13 +1,19 @@
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from .models import CustomUser
 from .serializers import UserSerializer, RegisterSerializer, LoginSerializer
 from django.shortcuts import get_object_or_404
-from .serializers import FollowSerializer, UserProfileSerializer
+from django.db import transaction
+from .serializers import FollowSerializer, UserProfileSerializer, BulkFollowSerializer
+from notifications.pipeline import notify, notify_many
+from posts import timeline
+from . import graph
+from . import authentication
+from social_media_api.conditional import ConditionalResponseMixin, versions
 # Create your views here.
 
 class RegisterView(generics.CreateAPIView):
@@ -46,13 +52,19 @@ class LoginView(generics.GenericAPIView):
             })
         return Response({'error': 'Invalid credentials'}, status=400)
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(ConditionalResponseMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
         return self.request.user
 
+    def retrieve(self, request, *args, **kwargs):
+        user = request.user
+        return self.conditional_response(
+            request, [user.pk, *versions(f'user:{user.pk}')], lambda: super(ProfileView, self).retrieve(request)
+        )
+
 
 
 class FollowView(generics.GenericAPIView):
@@ -63,15 +75,14 @@ class FollowView(generics.GenericAPIView):
         
         if user_to_follow == request.user:
             return Response({'error': 'You cannot follow yourself'}, status=400)
+
+        if graph.is_following(request.user, user_to_follow):
+            return Response({'message': f'You are already following {user_to_follow.username}'})
         
         request.user.follow(user_to_follow)
         
-        # Create notification for followed user
-        Notification.objects.create(
-            recipient=user_to_follow,
-            actor=request.user,
-            verb="started following you"
-        )
+        # Notify the followed user (delivered in the background, coalesced)
+        notify(user_to_follow, request.user, "started following you")
         
         return Response({'message': f'You are now following {user_to_follow.username}'})
 
@@ -83,16 +94,129 @@ class UnfollowView(generics.GenericAPIView):
         request.user.unfollow(user_to_unfollow)
         return Response({'message': f'You have unfollowed {user_to_unfollow.username}'})
 
-class FollowingListView(generics.ListAPIView):
+class BulkFollowMixin:
+    """Resolves the requested users with at most two in_bulk queries"""
+    serializer_class = BulkFollowSerializer
+    permission_classes = [IsAuthenticated]
+
+    def resolve_users(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+        usernames = serializer.validated_data['usernames']
+
+        users = {}
+        if user_ids:
+            users.update(CustomUser.objects.filter(is_active=True).in_bulk(user_ids))
+        if usernames:
+            found = CustomUser.objects.filter(is_active=True).in_bulk(usernames, field_name='username')
+            users.update({user.pk: user for user in found.values()})
+        not_found = [i for i in user_ids if i not in users]
+        found_names = {user.username for user in users.values()}
+        not_found += [name for name in usernames if name not in found_names]
+
+        # Following yourself is silently skipped
+        users.pop(request.user.pk, None)
+        return users, not_found
+
+
+class BulkFollowView(BulkFollowMixin, generics.GenericAPIView):
+    def post(self, request):
+        users, not_found = self.resolve_users(request)
+
+        Follow = CustomUser.followers.through
+        with transaction.atomic():
+            # Read from the table, not the cached following set, which may lag behind other processes
+            already = set(
+                Follow.objects.filter(from_customuser=request.user, to_customuser_id__in=list(users))
+                .values_list('to_customuser_id', flat=True)
+            )
+            to_follow = [user for pk, user in users.items() if pk not in already]
+            if to_follow:
+                Follow.objects.bulk_create(
+                    [Follow(from_customuser_id=request.user.pk, to_customuser_id=user.pk) for user in to_follow],
+                    ignore_conflicts=True,
+                )
+                graph.invalidate(request.user, to_follow)
+                timeline.followers_changed([user.pk for user in to_follow], followed=True)
+                timeline.backfill_many(request.user, [user.pk for user in to_follow])
+                notify_many(to_follow, request.user, "started following you")
+
+        return Response({
+            'followed': [user.pk for user in to_follow],
+            'already_following': [pk for pk in users if pk in already],
+            'not_found': not_found,
+        })
+
+
+class BulkUnfollowView(BulkFollowMixin, generics.GenericAPIView):
+    def post(self, request):
+        users, not_found = self.resolve_users(request)
+
+        Follow = CustomUser.followers.through
+        with transaction.atomic():
+            rows = Follow.objects.filter(from_customuser=request.user, to_customuser_id__in=list(users))
+            followed = list(rows.values_list('to_customuser_id', flat=True))
+            # Users that weren't followed keep their versions (and cached follower lists)
+            if followed:
+                rows.delete()
+                graph.invalidate(request.user, followed)
+                timeline.followers_changed(followed, followed=False)
+                timeline.purge_many(request.user, followed)
+
+        return Response({
+            'unfollowed': followed,
+            'not_following': [pk for pk in users if pk not in followed],
+            'not_found': not_found,
+        })
+
+def versioned_user_page(view, request):
+    """
+    Paginate the view's users with whatever paginator it uses and version the
+    page by the rows on it, so a profile edit only invalidates the pages
+    showing that user. Returns (parts, render) for conditional_response.
+    """
+    queryset = view.filter_queryset(view.get_queryset())
+    page = view.paginate_queryset(queryset)
+    users = list(queryset) if page is None else page
+    user_ids = [user.pk for user in users]
+    parts = [*user_ids, *versions(*[f'user:{pk}' for pk in user_ids])]
+
+    def render_page():
+        data = view.get_serializer(users, many=True).data
+        return view.get_paginated_response(data) if page is not None else Response(data)
+
+    return parts, render_page
+
+class FollowingListView(ConditionalResponseMixin, generics.ListAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return self.request.user.followers.all()
+        return self.request.user.followers.order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        user = request.user
+        page_parts, render_page = versioned_user_page(self, request)
+        parts = [user.pk, request.get_full_path(), graph.version(user), *page_parts]
+        return self.conditional_response(request, parts, render_page)
 
-class FollowersListView(generics.ListAPIView):
+class FollowersListView(ConditionalResponseMixin, generics.ListAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return CustomUser.objects.filter(followers=self.request.user)
\ No newline at end of file
+        return CustomUser.objects.filter(followers=self.request.user).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        # is_following depends on the viewer's own following set as well
+        user = request.user
+        page_parts, render_page = versioned_user_page(self, request)
+        parts = [user.pk, request.get_full_path(), graph.followers_version(user), graph.version(user), *page_parts]
+        return self.conditional_response(request, parts, render_page)
+
+class AuthCacheStatsView(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(authentication.stats())
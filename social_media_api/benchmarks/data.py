@@ -0,0 +1,194 @@
+"""
+Synthetic data for benchmarks.
+
+generate() fills the database with bench_* users and a follow graph,
+posts, likes, comments and notifications, sized from a total row count.
+Popularity is skewed (a few authors get most followers and likes) so the
+fan-out, celebrity and counter paths behave like production rather than
+a uniform toy dataset. The same seed always produces the same data.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from posts.models import Comment, Like, Post, TimelineEntry
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_'
+PASSWORD = 'benchmark'
+BATCH_SIZE = 2000
+
+# Share of the requested rows given to each table
+MIX = {
+    'users': 0.02,
+    'follows': 0.20,
+    'posts': 0.10,
+    'likes': 0.38,
+    'comments': 0.15,
+    'notifications': 0.15,
+}
+
+VERBS = ["liked your post", "commented on your post", "started following you"]
+
+
+def plan(rows):
+    """Row counts per table for roughly `rows` rows in total"""
+    counts = {table: int(rows * share) for table, share in MIX.items()}
+    counts['users'] = max(counts['users'], 20)
+    return counts
+
+
+def bench_users():
+    return User.objects.filter(username__startswith=USERNAME_PREFIX)
+
+
+def flush():
+    """Delete all generated data (everything hangs off the bench_* users)"""
+    return bench_users().delete()[0]
+
+
+def _skewed_picker(rng, population, exponent=1.1):
+    """Sample from population with Zipf-like weights (earlier items are popular)"""
+    weights = [1 / (rank + 1) ** exponent for rank in range(len(population))]
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    def pick(k):
+        return rng.choices(population, cum_weights=cumulative, k=k)
+    return pick
+
+
+def _bulk(model, objects, **kwargs):
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE, **kwargs)
+
+
+def _chunks(total):
+    for start in range(0, total, BATCH_SIZE):
+        yield min(BATCH_SIZE, total - start)
+
+
+def generate(rows=10000, seed=0, days=30, timelines=True, log=print):
+    """
+    Create about `rows` rows of benchmark data; returns the counts per table.
+    Timeline entries are derived from the follow graph and not counted in `rows`.
+    """
+    rng = random.Random(seed)
+    counts = plan(rows)
+    now = timezone.now()
+    span = timedelta(days=days).total_seconds()
+
+    def timestamp():
+        return now - timedelta(seconds=rng.random() * span)
+
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        start = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        _bulk(User, [
+            User(username=f'{USERNAME_PREFIX}{start + i}', email=f'{USERNAME_PREFIX}{start + i}@example.com',
+                 password=password, bio='benchmark user')
+            for i in range(counts['users'])
+        ])
+        user_ids = list(bench_users().order_by('id').values_list('id', flat=True))
+    log(f"users: {len(user_ids)}")
+    popular_user = _skewed_picker(rng, user_ids)
+
+    # Follow graph: uniform followers, skewed followees
+    follows = set()
+    while len(follows) < counts['follows']:
+        for followee in popular_user(BATCH_SIZE):
+            follower = rng.choice(user_ids)
+            if follower != followee:
+                follows.add((follower, followee))
+    follows = list(follows)[:counts['follows']]
+    Follow = User.followers.through
+    _bulk(Follow, [Follow(from_customuser_id=a, to_customuser_id=b) for a, b in follows], ignore_conflicts=True)
+    log(f"follows: {len(follows)}")
+
+    # Posts; auto_now_add overrides created_at, so spread the timestamps afterwards
+    for size in _chunks(counts['posts']):
+        with transaction.atomic():
+            authors = popular_user(size)
+            _bulk(Post, [
+                Post(author_id=author, title=f'Post {rng.randrange(10 ** 6)}',
+                     content=' '.join(rng.choices(WORDS, k=rng.randint(8, 60))))
+                for author in authors
+            ])
+    post_ids = list(Post.objects.filter(author__in=user_ids).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        posts = [Post(id=post_id, created_at=timestamp()) for post_id in post_ids[start:start + BATCH_SIZE]]
+        Post.objects.bulk_update(posts, ['created_at'])
+    log(f"posts: {len(post_ids)}")
+    popular_post = _skewed_picker(rng, rng.sample(post_ids, len(post_ids)), exponent=0.8)
+
+    likes = set()
+    attempts = 0
+    while len(likes) < counts['likes'] and attempts < counts['likes'] * 3:
+        for post_id in popular_post(BATCH_SIZE):
+            likes.add((rng.choice(user_ids), post_id))
+        attempts += BATCH_SIZE
+    likes = list(likes)[:counts['likes']]
+    for start in range(0, len(likes), BATCH_SIZE):
+        _bulk(Like, [Like(user_id=u, post_id=p) for u, p in likes[start:start + BATCH_SIZE]],
+              ignore_conflicts=True)
+    log(f"likes: {len(likes)}")
+
+    for size in _chunks(counts['comments']):
+        _bulk(Comment, [
+            Comment(post_id=post_id, author_id=rng.choice(user_ids),
+                    content=' '.join(rng.choices(WORDS, k=rng.randint(3, 25))))
+            for post_id in popular_post(size)
+        ])
+    log(f"comments: {counts['comments']}")
+
+    for size in _chunks(counts['notifications']):
+        _bulk(Notification, [
+            Notification(recipient_id=recipient, actor_id=rng.choice(user_ids), verb=rng.choice(VERBS),
+                         read=rng.random() < 0.7)
+            for recipient in popular_user(size)
+        ])
+    log(f"notifications: {counts['notifications']}")
+
+    call_command('recount_post_counters', stdout=_Null())
+    if timelines:
+        counts['timeline_entries'] = build_timelines(user_ids)
+        log(f"timeline entries: {counts['timeline_entries']}")
+    return counts
+
+
+def build_timelines(user_ids):
+    """Materialize feeds as fan-out-on-write would have (newest posts per followed author)"""
+    from posts.timeline import backfill_many
+
+    created = TimelineEntry.objects.count()
+    followed = {}
+    for follower, followee in User.followers.through.objects.filter(from_customuser__in=user_ids).values_list(
+            'from_customuser_id', 'to_customuser_id').iterator(chunk_size=BATCH_SIZE):
+        followed.setdefault(follower, []).append(followee)
+    for follower, author_ids in followed.items():
+        backfill_many(User(pk=follower), author_ids)
+    return TimelineEntry.objects.count() - created
+
+
+class _Null:
+    def write(self, *args, **kwargs):
+        pass
+
+    def flush(self):
+        pass
+
+
+WORDS = (
+    "django api post feed like follow comment user profile cache query index "
+    "timeline notification search trending python database server request "
+    "response latency token page cursor graph signal worker queue batch"
+).split()
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks import workload
+
+
+class Command(BaseCommand):
+    help = "Run the scripted API workload against benchmark data and report latency percentiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000,
+                            help="Measured requests")
+        parser.add_argument('--warmup', type=int, default=50,
+                            help="Unmeasured requests run first")
+        parser.add_argument('--users', type=int, default=200,
+                            help="Distinct benchmark users making requests")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write results as JSON to this file")
+        parser.add_argument('--compare', help="Fail if results regress against this saved JSON run")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed p95 slowdown for --compare, as a fraction")
+
+    def handle(self, *args, **options):
+        # Lets the test client through ALLOWED_HOSTS without touching settings
+        setup_test_environment()
+        try:
+            try:
+                run = workload.Workload(seed=options['seed'], users=options['users'])
+                results = run.run(requests=options['requests'], warmup=options['warmup'])
+            except ValueError as e:
+                raise CommandError(e)
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'operation':<20}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'err':>5}")
+        for operation, r in results.items():
+            self.stdout.write(
+                f"{operation:<20}{r['requests']:>6}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+                f"{r['p99_ms']:>9.1f}{r['queries_mean']:>9.1f}{r['errors']:>5}"
+            )
+
+        meta = workload.metadata(requests=options['requests'], users=options['users'], seed=options['seed'])
+        if options['output']:
+            workload.save(options['output'], meta, results)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = workload.compare(baseline, results, options['threshold'])
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(line))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['compare']}")
+            self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import data
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, follows, posts, likes, comments and notifications for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help="Approximate total rows to create (e.g. 10000 to 1000000)")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed; the same seed gives the same data")
+        parser.add_argument('--days', type=int, default=30,
+                            help="Spread post timestamps over this many days")
+        parser.add_argument('--no-timelines', action='store_true',
+                            help="Skip materializing feed timelines")
+        parser.add_argument('--flush', action='store_true',
+                            help="Delete existing benchmark data first")
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            deleted = data.flush()
+            self.stdout.write(f"Deleted {deleted} existing benchmark rows")
+        elif data.bench_users().exists():
+            raise CommandError("Benchmark data already exists; pass --flush to replace it")
+
+        counts = data.generate(
+            rows=options['rows'],
+            seed=options['seed'],
+            days=options['days'],
+            timelines=not options['no_timelines'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Generated {sum(counts.values())} rows"))
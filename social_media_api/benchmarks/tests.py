@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from notifications.models import Notification
+from posts.models import Comment, Like, Post
+from . import data, workload
+
+User = get_user_model()
+
+
+class WorkloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data.generate(rows=1500, log=lambda *args: None)
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        return [model.objects.count() for model in (Like, Comment, Post, Notification, User.followers.through)]
+
+    def test_reads_succeed_and_hit_the_database(self):
+        reads = {operation: spec for operation, spec in workload.MIX.items() if spec[1] == 'GET'}
+        results = workload.Workload(users=5, mix=reads).run(requests=40, warmup=0)
+        self.assertEqual(set(results), set(reads))
+        for operation, result in results.items():
+            self.assertEqual(result['statuses'], {'200': result['requests']}, operation)
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries_mean'], 0, operation)
+
+    def test_writes_are_rolled_back(self):
+        before = self.snapshot()
+        results = workload.Workload(users=5).run(requests=60, warmup=0)
+        self.assertEqual(self.snapshot(), before)
+        for operation, result in results.items():
+            self.assertFalse([s for s in result['statuses'] if not s.startswith(('2', '4'))], operation)
+            self.assertGreater(result['queries_mean'], 0, operation)
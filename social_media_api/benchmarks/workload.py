@@ -0,0 +1,179 @@
+"""
+Scripted workload for benchmarks.
+
+Runs a weighted mix of API calls as randomly chosen bench_* users through
+Django's test client (the full middleware/DRF stack, without a network
+hop), timing each request and counting its SQL queries. Results are
+summarized per operation as p50/p95/p99 latency and queries per request;
+any non-2xx response counts as an error.
+
+A run happens inside one transaction that is rolled back at the end, so
+the likes, comments and follows it writes don't change the data the next
+run measures. on_commit callbacks are executed after each request, inside
+its timing, as a real commit would. Notifications are queued with the
+database backend meanwhile: a worker thread on its own connection could
+neither see the uncommitted rows nor, on SQLite, get past their lock.
+"""
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from posts.models import Post
+from social_media_api.querybudget import QueryBudget
+from .data import bench_users
+
+QUEUE_BACKEND = 'notifications.pipeline.DatabaseBackend'
+
+# operation: (weight, method); see Workload.request() for the URLs
+MIX = {
+    'feed': (30, 'GET'),
+    'post_list': (12, 'GET'),
+    'comment_list': (10, 'GET'),
+    'like': (10, 'POST'),
+    'unlike': (5, 'POST'),
+    'comment': (8, 'POST'),
+    'follow': (5, 'POST'),
+    'notification_count': (12, 'GET'),
+    'notification_list': (8, 'GET'),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Workload:
+    def __init__(self, seed=0, users=200, mix=None):
+        self.rng = random.Random(seed)
+        self.mix = mix or MIX
+        self.client = Client()
+        user_ids = list(bench_users().order_by('id').values_list('id', flat=True))
+        if not user_ids:
+            raise ValueError("No benchmark data; run seed_benchmark first")
+        self.all_user_ids = user_ids
+        self.tokens = {}
+        for user_id in self.rng.sample(user_ids, min(users, len(user_ids))):
+            token, _ = Token.objects.get_or_create(user_id=user_id)
+            self.tokens[user_id] = token.key
+        self.post_ids = list(Post.objects.filter(author__in=user_ids).values_list('id', flat=True))
+        self.samples = defaultdict(list)  # operation -> [(seconds, queries, status)]
+
+    def request(self, operation, user_id):
+        post_id = self.rng.choice(self.post_ids)
+        paths = {
+            'feed': '/api/posts/feed/',
+            'post_list': '/api/posts/posts/?cursor=',
+            'comment_list': f'/api/posts/posts/{post_id}/comments/',
+            'like': f'/api/posts/posts/{post_id}/like/',
+            'unlike': f'/api/posts/posts/{post_id}/unlike/',
+            'comment': f'/api/posts/posts/{post_id}/comments/',
+            'follow': f'/api/accounts/follow/{self.rng.choice(self.all_user_ids)}/',
+            'notification_count': '/api/notifications/unread-count/',
+            'notification_list': '/api/notifications/?count=false',
+        }
+        method = self.mix[operation][1]
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.tokens[user_id]}'}
+        # Per request: SECURE_SSL_REDIRECT would answer a plain-HTTP request with a 301
+        if method == 'GET':
+            return self.client.get(paths[operation], secure=True, **headers)
+        data = {'content': 'benchmark comment'} if operation == 'comment' else {}
+        return self.client.post(paths[operation], data, content_type='application/json', secure=True, **headers)
+
+    def run(self, requests=1000, warmup=50):
+        operations = list(self.mix)
+        weights = [self.mix[op][0] for op in operations]
+        user_ids = list(self.tokens)
+        with override_settings(NOTIFICATIONS_BACKEND=QUEUE_BACKEND), transaction.atomic():
+            for i in range(warmup + requests):
+                operation = self.rng.choices(operations, weights)[0]
+                user_id = self.rng.choice(user_ids)
+                with QueryBudget() as budget:
+                    start = time.perf_counter()
+                    with TestCase.captureOnCommitCallbacks(execute=True):
+                        response = self.request(operation, user_id)
+                    elapsed = time.perf_counter() - start
+                if response.status_code in (301, 302, 401, 403):
+                    # Every request would fail the same way; timing them is meaningless
+                    raise ValueError(f"{operation} returned {response.status_code}; check the settings and tokens")
+                if i >= warmup:
+                    self.samples[operation].append((elapsed, budget.count, response.status_code))
+            transaction.set_rollback(True)
+        return self.summary()
+
+    def summary(self):
+        results = {}
+        for operation, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+            queries = [count for _, count, _ in samples]
+            statuses = defaultdict(int)
+            for _, _, status in samples:
+                statuses[str(status)] += 1
+            results[operation] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, _, status in samples if not 200 <= status < 300),
+                'statuses': dict(statuses),
+                'mean_ms': sum(latencies) / len(latencies),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'queries_mean': sum(queries) / len(queries),
+                'queries_max': max(queries),
+            }
+        return results
+
+
+def metadata(**extra):
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+        'revision': revision,
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        **extra,
+    }
+
+
+def save(path, meta, results):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+
+def compare(baseline, results, threshold=0.2, min_ms=2.0):
+    """
+    Regressions against a saved run: p95 latency more than `threshold` (and
+    min_ms) slower, or more queries per request. Returns human-readable lines.
+    """
+    regressions = []
+    for operation, current in results.items():
+        before = baseline.get('results', {}).get(operation)
+        if before is None:
+            continue
+        slower = current['p95_ms'] - before['p95_ms']
+        if slower > min_ms and current['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(
+                f"{operation}: p95 {before['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms"
+            )
+        if current['queries_mean'] > before['queries_mean'] + 0.5:
+            regressions.append(
+                f"{operation}: queries/request {before['queries_mean']:.1f} -> {current['queries_mean']:.1f}"
+            )
+    return regressions
@@ -0,0 +1,140 @@
+"""
+Pub/sub brokers for pushing notifications to connected clients.
+
+InMemoryBroker works within one process (single-node deployments, tests);
+RedisBroker fans out across processes and needs the redis package.
+Select one with NOTIFICATIONS_BROKER.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+def channel_name(user_id):
+    return f'notifications:user:{user_id}'
+
+
+class BaseBroker:
+    def publish(self, user_id, message):
+        """Send a JSON-serializable message to the user's channel (callable from any thread)"""
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        """Return a subscription; must be called from the event loop that will read it"""
+        raise NotImplementedError
+
+
+class InMemorySubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except RuntimeError:
+            # Event loop already closed; the client is gone
+            pass
+
+    async def get(self, timeout):
+        """Next message, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker(BaseBroker):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def publish(self, user_id, message):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, user_id):
+        subscription = InMemorySubscription(self, user_id)
+        with self.lock:
+            self.subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.user_id]
+
+
+class RedisSubscription:
+    def __init__(self, client, user_id):
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.channel = channel_name(user_id)
+        self.subscribed = False
+
+    async def get(self, timeout):
+        if not self.subscribed:
+            await self.pubsub.subscribe(self.channel)
+            self.subscribed = True
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        if self.subscribed:
+            await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker(BaseBroker):
+    def __init__(self):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImportError("RedisBroker requires the 'redis' package (pip install redis)")
+        url = getattr(settings, 'NOTIFICATIONS_BROKER_URL', None) or 'redis://localhost:6379/0'
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self.async_module = redis.asyncio
+
+    def publish(self, user_id, message):
+        self.client.publish(channel_name(user_id), json.dumps(message))
+
+    def subscribe(self, user_id):
+        return RedisSubscription(self.async_module.Redis.from_url(self.url), user_id)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'NOTIFICATIONS_BROKER', 'notifications.broker.InMemoryBroker'))()
+    return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting in ('NOTIFICATIONS_BROKER', 'NOTIFICATIONS_BROKER_URL'):
+        _broker = None
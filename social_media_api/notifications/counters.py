@@ -0,0 +1,68 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Notification
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _ttl():
+    return getattr(settings, 'NOTIFICATIONS_UNREAD_CACHE_TTL', 300)
+
+
+def count_unread_in_db(user_id):
+    """Fallback path, served by the (recipient, read, created_at) index"""
+    return Notification.objects.filter(recipient_id=user_id, read=False).count()
+
+
+def get_unread_count(user):
+    count = cache.get(_key(user.pk))
+    if count is None:
+        count = count_unread_in_db(user.pk)
+        cache.set(_key(user.pk), count, _ttl())
+    return count
+
+
+def incr_unread(user_id, delta=1):
+    """Bump a cached counter; a missing key is left for the next read to rebuild"""
+    try:
+        cache.incr(_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+def decr_unread(user_id, delta=1):
+    try:
+        if cache.decr(_key(user_id), delta) < 0:
+            cache.set(_key(user_id), 0, _ttl())
+    except ValueError:
+        pass
+
+
+def record_created(notifications):
+    """Increment counters for freshly inserted unread notifications"""
+    for user_id, created in Counter(n.recipient_id for n in notifications).items():
+        incr_unread(user_id, created)
+
+
+def reset_unread(user_id, count=0):
+    cache.set(_key(user_id), count, _ttl())
+
+
+def reconcile(user_ids):
+    """Rewrite cached counters for the given users from the database in one query"""
+    user_ids = list(user_ids)
+    counts = dict(
+        Notification.objects.filter(recipient_id__in=user_ids, read=False)
+        .order_by()
+        .values('recipient_id')
+        .annotate(n=Count('id'))
+        .values_list('recipient_id', 'n')
+    )
+    cache.set_many({_key(user_id): counts.get(user_id, 0) for user_id in user_ids}, _ttl())
+    return counts
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from notifications.retention import compact
+
+
+class Command(BaseCommand):
+    help = "Roll read notifications older than the retention age into summaries and delete them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Retention age (defaults to NOTIFICATIONS_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows deleted per transaction")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report what would be removed")
+
+    def handle(self, *args, **options):
+        rows, reclaimed = compact(options['days'], options['batch_size'], options['dry_run'])
+        size = f"~{reclaimed} bytes" if reclaimed is not None else "an unknown number of bytes"
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {rows} notifications, reclaiming {size}"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.pipeline import drain_pending
+
+
+class Command(BaseCommand):
+    help = "Worker that delivers queued notifications (NOTIFICATIONS_BACKEND = DatabaseBackend)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Events per batch (defaults to NOTIFICATIONS_BATCH_SIZE)")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = drain_pending(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Delivered {total} notification events"))
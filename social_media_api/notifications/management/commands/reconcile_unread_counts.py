@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from notifications import counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild cached unread-notification counters from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Users reconciled per query")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        user_ids = get_user_model().objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+        reconciled = 0
+        last_id = 0
+
+        while True:
+            batch = list(user_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            counters.reconcile(batch)
+            reconciled += len(batch)
+            last_id = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled unread counters for {reconciled} users"))
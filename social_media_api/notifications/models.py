@@ -9,23 +9,77 @@ class Notification(models.Model):
     verb = models.CharField(max_length=100)  # e.g., "liked your post", "commented on", "followed you"
     target_post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, null=True, blank=True)
     target_comment = models.ForeignKey('posts.Comment', on_delete=models.CASCADE, null=True, blank=True)
+    # Number of distinct actors coalesced into this row; actor is the most recent one
+    actor_count = models.PositiveIntegerField(default=1)
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'read', 'created_at'], name='notif_recipient_read_idx'),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_recent_idx'),
+        ]
+
     def __str__(self):
 
         return f"{self.actor.username} {self.verb}"
-ass Notification(models.Model):
-    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
-    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='actor_notifications')
+
+    @property
+    def message(self):
+        """e.g. "alice and 41 others liked your post\""""
+        others = self.actor_count - 1
+        if others <= 0:
+            return f"{self.actor.username} {self.verb}"
+        noun = "other" if others == 1 else "others"
+        return f"{self.actor.username} and {others} {noun} {self.verb}"
+
+
+class NotificationActor(models.Model):
+    """One row per distinct actor coalesced into a notification (actor_count counts these)"""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'actor'], name='notification_actor_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} -> notification {self.notification_id}"
+
+
+class PendingNotification(models.Model):
+    """
+    Queued notification event, drained by the process_notifications worker
+    when NOTIFICATIONS_BACKEND is the database backend.
+    """
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
     verb = models.CharField(max_length=100)
-    target_post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, null=True, blank=True)
-    target_comment = models.ForeignKey('posts.Comment', on_delete=models.CASCADE, null=True, blank=True)
-    read = models.BooleanField(default=False)
+    target_post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    target_comment = models.ForeignKey('posts.Comment', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
 
-    timestamp = models.DateTimeField(auto_now_add=True)
-    
     def __str__(self):
-        return f"{self.actor.username} {self.verb}"
+        return f"pending: {self.actor_id} {self.verb} -> {self.recipient_id}"
+
 
+class NotificationSummary(models.Model):
+    """
+    Rollup of read notifications removed by compact_notifications:
+    one row per recipient and verb. actor_count is the number of distinct
+    actors, kept in step with the actors relation.
+    """
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_summaries')
+    verb = models.CharField(max_length=100)
+    archived_count = models.PositiveIntegerField(default=0)
+    actor_count = models.PositiveIntegerField(default=0)
+    actors = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='+', blank=True)
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
 
+    class Meta:
+        unique_together = ['recipient', 'verb']
+
+    def __str__(self):
+        return f"{self.recipient_id}: {self.archived_count} x {self.verb}"
@@ -0,0 +1,276 @@
+"""
+Background notification pipeline.
+
+Views call notify(); events are handed to the configured backend
+(NOTIFICATIONS_BACKEND) after the surrounding transaction commits and are
+delivered in batches: bursts for the same recipient/verb/target within
+NOTIFICATIONS_COALESCE_WINDOW collapse into one row ("alice and 41 others
+liked your post") and new rows are written with bulk_create.
+
+Delivered rows are then published to the recipient's live stream through
+the configured broker (see broker.py).
+
+Backends:
+    ImmediateBackend    deliver inline on commit (tests)
+    InProcessBackend    daemon thread draining an in-memory queue
+    DatabaseBackend     PendingNotification table drained by the
+                        process_notifications management command
+"""
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import counters
+from .broker import get_broker
+from .models import Notification, NotificationActor, PendingNotification
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['recipient_id', 'actor_id', 'verb', 'target_post_id', 'target_comment_id'])
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def deliver(events):
+    """
+    Coalesce a batch of events and write them.
+    Returns the list of Notification rows created or updated.
+    """
+    if not events:
+        return []
+
+    # Group by recipient/verb/target, keeping the latest event and distinct actors
+    groups = OrderedDict()
+    for event in events:
+        key = (event.recipient_id, event.verb, event.target_post_id)
+        latest, actors = groups.get(key, (None, set()))
+        actors.add(event.actor_id)
+        groups[key] = (event, actors)
+
+    window = timedelta(seconds=_setting('NOTIFICATIONS_COALESCE_WINDOW', 3600))
+    now = timezone.now()
+    batch_size = _setting('NOTIFICATIONS_BATCH_SIZE', 500)
+    with transaction.atomic():
+        # Lock the rows being merged into, so one marked read meanwhile isn't
+        # updated behind the user's back: it drops out here and a new row is created
+        existing = {}
+        candidates = Notification.objects.select_for_update().filter(
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+            read=False,
+            created_at__gte=now - window,
+        ).order_by('created_at')
+        for notification in candidates:
+            existing[(notification.recipient_id, notification.verb, notification.target_post_id)] = notification
+
+        # Actors already counted on the rows being merged into (a like, unlike
+        # and like again from the same person counts once)
+        seen = set(
+            NotificationActor.objects.filter(
+                notification__in=[n.pk for n in existing.values()],
+                actor_id__in={actor for _, actors in groups.values() for actor in actors},
+            ).values_list('notification_id', 'actor_id')
+        )
+
+        to_create, to_update, new_actors = [], [], []
+        for key, (event, actors) in groups.items():
+            notification = existing.get(key)
+            if notification is None:
+                notification = Notification(
+                    recipient_id=event.recipient_id,
+                    actor_id=event.actor_id,
+                    verb=event.verb,
+                    target_post_id=event.target_post_id,
+                    target_comment_id=event.target_comment_id,
+                    actor_count=len(actors),
+                )
+                to_create.append(notification)
+                new_actors.append((notification, actors))
+                continue
+            actors = {actor for actor in actors if (notification.pk, actor) not in seen}
+            notification.actor_id = event.actor_id
+            notification.target_comment_id = event.target_comment_id or notification.target_comment_id
+            notification.actor_count += len(actors)
+            notification.created_at = now  # resurface the row at the top of the inbox
+            to_update.append(notification)
+            new_actors.append((notification, actors))
+
+        created = Notification.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            Notification.objects.bulk_update(
+                to_update, ['actor', 'target_comment', 'actor_count', 'created_at'], batch_size=batch_size
+            )
+        NotificationActor.objects.bulk_create(
+            [NotificationActor(notification_id=n.pk, actor_id=actor) for n, actors in new_actors for actor in actors],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        transaction.on_commit(lambda: counters.record_created(created))
+        delivered = created + to_update
+        transaction.on_commit(lambda: publish([n.pk for n in delivered]))
+    return delivered
+
+
+def publish(notification_ids):
+    """Push delivered notifications to their recipients' live streams"""
+    from .serializers import NotificationSerializer
+
+    try:
+        broker = get_broker()
+        notifications = list(Notification.objects.filter(id__in=notification_ids).select_related('actor'))
+        for notification, data in zip(notifications, NotificationSerializer(notifications, many=True).data):
+            broker.publish(notification.recipient_id, data)
+    except Exception:
+        logger.exception("Failed to publish %d notifications", len(notification_ids))
+
+
+class BaseBackend:
+    def enqueue(self, event):
+        raise NotImplementedError
+
+    def enqueue_many(self, events):
+        for event in events:
+            self.enqueue(event)
+
+    def flush(self):
+        """Deliver everything queued so far (used by tests and on shutdown)"""
+
+
+class ImmediateBackend(BaseBackend):
+    def enqueue(self, event):
+        deliver([event])
+
+    def enqueue_many(self, events):
+        deliver(events)
+
+
+class InProcessBackend(BaseBackend):
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def enqueue(self, event):
+        self._ensure_worker()
+        self.queue.put(event)
+
+    def flush(self):
+        if self.worker is not None:
+            self.queue.join()
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name='notification-worker', daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        batch_size = _setting('NOTIFICATIONS_BATCH_SIZE', 500)
+        interval = _setting('NOTIFICATIONS_FLUSH_INTERVAL', 1.0)
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                deliver(batch)
+            except Exception:
+                logger.exception("Failed to deliver %d notification events", len(batch))
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+
+class DatabaseBackend(BaseBackend):
+    def enqueue(self, event):
+        PendingNotification.objects.create(**event._asdict())
+
+    def enqueue_many(self, events):
+        PendingNotification.objects.bulk_create(
+            [PendingNotification(**event._asdict()) for event in events],
+            batch_size=_setting('NOTIFICATIONS_BATCH_SIZE', 500),
+        )
+
+    def flush(self):
+        while drain_pending():
+            pass
+
+
+def drain_pending(batch_size=None):
+    """Deliver one batch of PendingNotification rows; returns how many were processed"""
+    batch_size = batch_size or _setting('NOTIFICATIONS_BATCH_SIZE', 500)
+    with transaction.atomic():
+        pending = list(
+            PendingNotification.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not pending:
+            return 0
+        deliver([
+            Event(p.recipient_id, p.actor_id, p.verb, p.target_post_id, p.target_comment_id) for p in pending
+        ])
+        PendingNotification.objects.filter(id__in=[p.id for p in pending]).delete()
+    return len(pending)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(_setting('NOTIFICATIONS_BACKEND', 'notifications.pipeline.InProcessBackend'))()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'NOTIFICATIONS_BACKEND':
+        _backend = None
+
+
+def notify(recipient, actor, verb, target_post=None, target_comment=None):
+    """Queue a notification; it is delivered once the current transaction commits"""
+    if recipient == actor:
+        return
+    event = Event(
+        recipient.pk,
+        actor.pk,
+        verb,
+        target_post.pk if target_post is not None else None,
+        target_comment.pk if target_comment is not None else None,
+    )
+    transaction.on_commit(lambda: get_backend().enqueue(event))
+
+
+def notify_many(recipients, actor, verb, target_post=None, target_comment=None):
+    """notify() for several recipients, handed to the backend as one batch"""
+    events = [
+        Event(
+            recipient.pk,
+            actor.pk,
+            verb,
+            target_post.pk if target_post is not None else None,
+            target_comment.pk if target_comment is not None else None,
+        )
+        for recipient in recipients
+        if recipient != actor
+    ]
+    if events:
+        transaction.on_commit(lambda: get_backend().enqueue_many(events))
@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .models import Notification, NotificationActor, NotificationSummary
+
+
+def retention_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'NOTIFICATIONS_RETENTION_DAYS', 90)
+    return timezone.now() - timedelta(days=days)
+
+
+def estimate_row_bytes():
+    """Average on-disk size of a notification row, or None if the backend can't say"""
+    table = Notification._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT pg_total_relation_size(%s) / GREATEST(reltuples, 1) FROM pg_class WHERE relname = %s",
+                    [table, table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT SUM(pgsize) * 1.0 / MAX((SELECT COUNT(*) FROM %s), 1) FROM dbstat WHERE name = %%s" % table,
+                    [table],
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    return float(row[0]) if row and row[0] is not None else None
+
+
+def _roll_up(ids):
+    """Fold a batch of notifications into NotificationSummary rows"""
+    groups = (
+        Notification.objects.filter(id__in=ids)
+        .order_by()
+        .values('recipient_id', 'verb')
+        .annotate(archived=Count('id'), first=Min('created_at'), last=Max('created_at'))
+    )
+    # Everyone coalesced into the batch, so repeat actors are counted once per summary
+    actors = defaultdict(set)
+    pairs = NotificationActor.objects.filter(notification_id__in=ids).values_list(
+        'notification__recipient_id', 'notification__verb', 'actor_id'
+    )
+    for recipient_id, verb, actor_id in pairs.distinct():
+        actors[recipient_id, verb].add(actor_id)
+
+    for group in groups:
+        summary, created = NotificationSummary.objects.select_for_update().get_or_create(
+            recipient_id=group['recipient_id'],
+            verb=group['verb'],
+            defaults={
+                'archived_count': group['archived'],
+                'first_created_at': group['first'],
+                'last_created_at': group['last'],
+            },
+        )
+        if not created:
+            summary.archived_count += group['archived']
+            summary.first_created_at = min(summary.first_created_at, group['first'])
+            summary.last_created_at = max(summary.last_created_at, group['last'])
+        summary.actors.add(*actors[group['recipient_id'], group['verb']])
+        summary.actor_count = summary.actors.count()
+        summary.save(update_fields=['archived_count', 'actor_count', 'first_created_at', 'last_created_at'])
+
+
+def compact(days=None, batch_size=1000, dry_run=False):
+    """
+    Delete read notifications older than the retention age in chunks of
+    batch_size, rolling each chunk into per-user summaries first.
+    Safe to run from cron or any scheduler. Returns (rows, estimated bytes).
+    """
+    cutoff = retention_cutoff(days)
+    expired = Notification.objects.filter(read=True, created_at__lt=cutoff).order_by('id')
+    row_bytes = estimate_row_bytes()
+
+    if dry_run:
+        rows = expired.count()
+    else:
+        rows = 0
+        while True:
+            with transaction.atomic():
+                ids = list(expired.values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                _roll_up(ids)
+                Notification.objects.filter(id__in=ids).delete()
+            rows += len(ids)
+
+    reclaimed = int(rows * row_bytes) if row_bytes is not None else None
+    return rows, reclaimed
@@ -3,9 +3,10 @@ from .models import Notification
 
 class NotificationSerializer(serializers.ModelSerializer):
     actor_username = serializers.ReadOnlyField(source='actor.username')
+    message = serializers.ReadOnlyField()
     
     class Meta:
         model = Notification
-        fields = ['id', 'actor_username', 'verb', 'target_post', 'target_comment', 'read', 'created_at']
+        fields = ['id', 'actor_username', 'verb', 'actor_count', 'message', 'target_post', 'target_comment', 'read', 'created_at']
         read_only_fields = fields
 
@@ -1,3 +1,222 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts import authentication
+from posts.models import Post
+from . import counters, retention, views
+from .models import Notification, NotificationSummary
+from .pipeline import notify
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_BACKEND='notifications.pipeline.ImmediateBackend')
+class CoalescingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(3)]
+        self.post = Post.objects.create(author=self.author, title='Hello', content='World')
+
+    def like(self, fan):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.author, fan, 'liked your post', target_post=self.post)
+
+    def test_burst_coalesces_into_one_row(self):
+        for fan in self.fans:
+            self.like(fan)
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.actor, self.fans[2])
+        self.assertEqual(notification.message, 'fan2 and 2 others liked your post')
+
+    def test_repeat_actor_is_counted_once(self):
+        # like, unlike, like again: the same person must not inflate "and N others"
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.actor, self.fans[1])
+
+    def test_read_row_is_not_merged_into(self):
+        self.like(self.fans[0])
+        Notification.objects.filter(recipient=self.author).update(read=True)
+        self.like(self.fans[1])
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        unread = Notification.objects.get(recipient=self.author, read=False)
+        self.assertEqual((unread.actor, unread.actor_count), (self.fans[1], 1))
+
+    def test_other_targets_are_kept_apart(self):
+        other_post = Post.objects.create(author=self.author, title='Other', content='Post')
+        self.like(self.fans[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.author, self.fans[1], 'liked your post', target_post=other_post)
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        actor = User.objects.create_user(username='actor', password='pass12345')
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, actor=actor, verb=f'event {i}') for i in range(15)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_mode_without_count_by_default(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('notifications'))
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_numbers_on_request(self):
+        response = self.client.get(reverse('notifications'), {'page': 2, 'count': 'true'})
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+@override_settings(NOTIFICATIONS_BACKEND='notifications.pipeline.ImmediateBackend')
+class StreamReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(2)]
+
+    def follow(self, fan):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, fan, 'started following you')
+
+    @override_settings(NOTIFICATIONS_STREAM_REPLAY_OVERLAP=0)
+    def test_coalesced_update_is_replayed(self):
+        self.follow(self.fans[0])
+        notification = Notification.objects.get(recipient=self.user)
+        last_event_id = views._event_id(notification.created_at)
+
+        # Merging into the same row keeps its ID but moves it past the client's last event
+        self.follow(self.fans[1])
+        replayed = views._missed_notifications(self.user, last_event_id + 1)
+        self.assertEqual([data['id'] for data in replayed], [notification.pk])
+        self.assertEqual(replayed[0]['actor_count'], 2)
+        self.assertGreater(views._event_id(replayed[0]['created_at']), last_event_id)
+
+    def test_authenticates_with_configured_classes(self):
+        token = Token.objects.create(user=self.user)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        request.user = AnonymousUser()
+        before = authentication.stats()['lookups']
+        self.assertEqual(views._authenticate(request), self.user)
+        self.assertEqual(authentication.stats()['lookups'], before + 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_BACKEND='notifications.pipeline.ImmediateBackend')
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return self.client.get(reverse('unread_count')).data['unread_count']
+
+    def notify(self, fan, verb):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, fan, verb)
+
+    def test_count_is_cached_and_follows_delivery_and_reads(self):
+        self.assertEqual(self.unread(), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 0)
+
+        for n, fan in enumerate(self.fans):
+            self.notify(fan, f'event {n}')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 3)
+
+        self.client.get(reverse('notifications'))  # marks the page read
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 0)
+
+    def test_reconcile_rewrites_drifted_counters(self):
+        self.notify(self.fans[0], 'started following you')
+        counters.reset_unread(self.user.pk, 42)
+        out = StringIO()
+        call_command('reconcile_unread_counts', '--batch-size', '2', stdout=out)
+        self.assertIn(f'for {User.objects.count()} users', out.getvalue())
+        self.assertEqual(self.unread(), 1)
+
+    def test_missing_counter_falls_back_to_the_database(self):
+        self.notify(self.fans[0], 'started following you')
+        cache.clear()
+        self.assertEqual(self.unread(), 1)
+
+
+@override_settings(NOTIFICATIONS_BACKEND='notifications.pipeline.ImmediateBackend')
+class CompactionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(3)]
+
+    def notify(self, fan, verb, days_ago=200, read=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, fan, verb)
+        created = timezone.now() - timezone.timedelta(days=days_ago)
+        Notification.objects.filter(recipient=self.user, verb=verb).update(read=read, created_at=created)
+
+    def test_only_old_read_rows_are_removed(self):
+        self.notify(self.fans[0], 'old read')
+        self.notify(self.fans[0], 'old unread', read=False)
+        self.notify(self.fans[0], 'new read', days_ago=1)
+        rows, _ = retention.compact(days=90)
+        self.assertEqual(rows, 1)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('verb', flat=True)), ['new read', 'old unread']
+        )
+        self.assertEqual(list(NotificationSummary.objects.values_list('verb', flat=True)), ['old read'])
+
+    def test_dry_run_counts_without_deleting(self):
+        self.notify(self.fans[0], 'old read')
+        out = StringIO()
+        call_command('compact_notifications', '--dry-run', stdout=out)
+        self.assertIn('Would remove 1 notifications', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(NotificationSummary.objects.exists())
+
+    def test_summary_counts_distinct_actors_across_rows_and_runs(self):
+        # read rows are never merged into, so each call lands in its own row
+        for fan in (self.fans[0], self.fans[1], self.fans[0], self.fans[1]):
+            self.notify(fan, 'liked your post')
+        retention.compact(days=90, batch_size=3)
+
+        summary = NotificationSummary.objects.get(recipient=self.user, verb='liked your post')
+        self.assertEqual((summary.archived_count, summary.actor_count), (4, 2))
+
+        for fan in (self.fans[2], self.fans[0]):
+            self.notify(fan, 'liked your post', days_ago=100)
+        retention.compact(days=90)
+        summary.refresh_from_db()
+        self.assertEqual((summary.archived_count, summary.actor_count), (6, 3))
+        self.assertEqual(set(summary.actors.all()), set(self.fans))
+        self.assertLess(summary.first_created_at, summary.last_created_at)
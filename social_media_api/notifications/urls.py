@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.NotificationListView.as_view(), name='notifications'),
+    path('unread-count/', views.NotificationUnreadCountView.as_view(), name='unread_count'),
+    path('stream/', views.notification_stream, name='notification_stream'),
+]
@@ -1,8 +1,21 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, permissions
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from .models import Notification
 from .serializers import NotificationSerializer
+from . import counters
+from .broker import get_broker
+from posts.pagination import NotificationPagination
 
 # Create your views here.
 
@@ -10,18 +23,126 @@ from .serializers import NotificationSerializer
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
     
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
+        return (
+            Notification.objects.filter(recipient=self.request.user)
+            .select_related('actor')
+            .order_by('-created_at', '-id')
+        )
     
-    def get(self, request, *args, **kwargs):
-        # Mark all notifications as read when user views them
-        Notification.objects.filter(recipient=request.user, read=False).update(read=True)
-        return super().get(request, *args, **kwargs)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        notifications = page if page is not None else list(self.get_queryset())
+        data = self.get_serializer(notifications, many=True).data
+
+        # Mark only the notifications being returned as read; the response
+        # still shows which of them were unread when fetched
+        unread_ids = [n.id for n in notifications if not n.read]
+        if unread_ids:
+            marked = Notification.objects.filter(id__in=unread_ids, read=False).update(read=True)
+            counters.decr_unread(request.user.pk, marked)
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
 class NotificationUnreadCountView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        count = Notification.objects.filter(recipient=request.user, read=False).count()
-        return Response({'unread_count': count})
\ No newline at end of file
+        count = counters.get_unread_count(request.user)
+        return Response({'unread_count': count})
+
+
+def _sse(data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('event: notification')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _authenticate(request):
+    """The configured DRF authentication classes (cached token, then session)"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    user = Request(request, authenticators=authenticators).user
+    return user if user.is_authenticated else None
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _event_id(created_at):
+    """
+    Event IDs are created_at in microseconds: the pipeline bumps created_at
+    when it coalesces into a row, so updates to old rows sort after the
+    client's last event too (row IDs don't change)
+    """
+    if isinstance(created_at, str):
+        created_at = parse_datetime(created_at)
+    return (created_at - _EPOCH) // timedelta(microseconds=1)
+
+
+def _missed_notifications(user, last_event_id):
+    limit = getattr(settings, 'NOTIFICATIONS_STREAM_REPLAY_LIMIT', 100)
+    # Rows written by a batch that committed late can carry a slightly older
+    # created_at, so replay with some overlap; clients upsert by notification id
+    overlap = timedelta(seconds=getattr(settings, 'NOTIFICATIONS_STREAM_REPLAY_OVERLAP', 5))
+    since = _EPOCH + timedelta(microseconds=last_event_id) - overlap
+    notifications = (
+        Notification.objects.filter(recipient=user, created_at__gte=since)
+        .select_related('actor')
+        .order_by('created_at', 'id')[:limit]
+    )
+    return NotificationSerializer(notifications, many=True).data
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications (needs ASGI).
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) and first
+    receive everything delivered or coalesced since that event.
+    """
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except AuthenticationFailed as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=401)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid Last-Event-ID.'}, status=400)
+
+    heartbeat = getattr(settings, 'NOTIFICATIONS_STREAM_HEARTBEAT', 15)
+
+    async def events():
+        # Subscribe before replaying so nothing published in between is lost
+        subscription = get_broker().subscribe(user.pk)
+        try:
+            yield 'retry: 3000\n\n'
+            seen = last_id or 0
+            if last_id is not None:
+                for data in await sync_to_async(_missed_notifications)(user, last_id):
+                    seen = max(seen, _event_id(data['created_at']))
+                    yield _sse(data, seen)
+            while True:
+                data = await subscription.get(heartbeat)
+                if data is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                # Keep event IDs monotonic even if a late batch carries an older created_at
+                seen = max(seen, _event_id(data['created_at']))
+                yield _sse(data, seen)
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Timeline, follow-graph and trending state is only consistent across processes in a shared cache"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith(('LocMemCache', 'DummyCache')):
+        return [Warning(
+            "The default cache is process-local.",
+            hint="Set REDIS_URL so timeline and follow-graph invalidations reach every process.",
+            id='posts.W001',
+        )]
+    return []
@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+
+from .models import Comment
+
+
+def preview_size():
+    return getattr(settings, 'POSTS_COMMENTS_PREVIEW_SIZE', 3)
+
+
+def prefetch_comment_previews(posts, limit=None):
+    """
+    Attach the `limit` most recent comments (oldest first, authors loaded)
+    to each post as post.comments_preview, in a single windowed query.
+    """
+    limit = preview_size() if limit is None else limit
+    posts = [post for post in posts if not hasattr(post, 'comments_preview')]
+    if not posts:
+        return
+
+    previews = defaultdict(list)
+    if limit > 0:
+        recent = (
+            Comment.objects.filter(post_id__in=[post.pk for post in posts])
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=[F('post_id')],
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(position__lte=limit)
+            .select_related('author')
+            .order_by('post_id', 'created_at', 'id')
+        )
+        for comment in recent:
+            previews[comment.post_id].append(comment)
+
+    for post in posts:
+        post.comments_preview = previews.get(post.pk, [])
+
+
+def full_comments_prefetch():
+    """Prefetch for single-post responses that return every comment"""
+    return Prefetch('comments', queryset=Comment.objects.select_related('author').order_by('created_at', 'id'))
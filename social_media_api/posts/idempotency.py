@@ -0,0 +1,39 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+def idempotent(view_method):
+    """
+    Honour an Idempotency-Key header on a POST handler: the first response
+    for a (user, path, key) is stored and replayed for retries.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        cache_key = f'idempotency:{request.user.pk}:{request.path}:{key}'
+        stored = cache.get(cache_key)
+        if stored is not None:
+            status, data = stored
+            response = Response(data, status=status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, True, 30):
+            return Response({'error': 'A request with this Idempotency-Key is in progress'}, status=409)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600)
+                cache.set(cache_key, (response.status_code, response.data), ttl)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,59 @@
+"""
+Race-free like/unlike.
+
+like() is a single INSERT ... ON CONFLICT DO NOTHING RETURNING where the
+database supports it (PostgreSQL, SQLite 3.35+), so concurrent double-taps
+can't raise IntegrityError; elsewhere it falls back to a savepoint around
+the insert. unlike() is a single DELETE whose row count says whether
+anything changed. Counters, notifications and the trending flag are only
+touched when a row actually changed.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from notifications.pipeline import notify
+from .models import Like, Post, TrendingPost
+
+
+def _insert_like(user_id, post_id):
+    """Insert the like row; returns True if it was created"""
+    if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_rows_from_bulk_insert:
+        # Raw SQL skips field adaptation, so store created_at the way the ORM would
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Like._meta.db_table} (user_id, post_id, created_at) VALUES (%s, %s, %s) "
+                f"ON CONFLICT (user_id, post_id) DO NOTHING RETURNING id",
+                [user_id, post_id, created_at],
+            )
+            return cursor.fetchone() is not None
+    try:
+        with transaction.atomic():
+            Like.objects.create(user_id=user_id, post_id=post_id)
+        return True
+    except IntegrityError:
+        return False
+
+
+def like(user, post):
+    """Like a post; returns True if the post was not already liked"""
+    with transaction.atomic():
+        created = _insert_like(user.pk, post.pk)
+        if created:
+            Post.objects.filter(pk=post.pk).update(likes_count=F('likes_count') + 1)
+            notify(post.author, user, "liked your post", target_post=post)
+    return created
+
+
+def unlike(user, post):
+    """Remove a like; returns True if there was one"""
+    with transaction.atomic():
+        # A plain delete() would SELECT the row first to send post_delete (see signals.py);
+        # Like has no dependents, so delete directly and flag the trending row here instead
+        likes = Like.objects.filter(user=user, post=post)
+        deleted = likes._raw_delete(likes.db)
+        if deleted:
+            Post.objects.filter(pk=post.pk, likes_count__gt=0).update(likes_count=F('likes_count') - 1)
+            TrendingPost.objects.filter(post_id=post.pk, needs_refresh=False).update(needs_refresh=True)
+    return bool(deleted)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Post, Like, Comment
+
+
+def _count_subquery(model):
+    counts = (
+        model.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.likes_count and Post.comments_count where they have drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Posts checked and updated per batch")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report drifted posts without writing")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        checked = fixed = 0
+        last_id = 0
+
+        while True:
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+
+            drifted = list(
+                Post.objects.filter(id__in=ids)
+                .annotate(actual_likes=_count_subquery(Like), actual_comments=_count_subquery(Comment))
+                .filter(~Q(likes_count=F('actual_likes')) | ~Q(comments_count=F('actual_comments')))
+                .only('id', 'likes_count', 'comments_count')
+            )
+            for post in drifted:
+                post.likes_count = post.actual_likes
+                post.comments_count = post.actual_comments
+
+            if drifted and not dry_run:
+                Post.objects.bulk_update(drifted, ['likes_count', 'comments_count'])
+            fixed += len(drifted)
+
+        verb = "would fix" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} posts, {verb} {fixed} drifted counters"))
+
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh the trending posts table from recent likes and comments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep refreshing every --interval seconds")
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Seconds between refreshes with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            updated, removed = refresh()
+            self.stdout.write(self.style.SUCCESS(f"Trending: {updated} posts rescored, {removed} expired"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Kept in step with posts.search; triggers keep the index current in the same
+# transaction as the post row, so every connection (and replica) sees it.
+POSTGRES_FORWARDS = [
+    "CREATE TABLE posts_post_search ("
+    "post_id bigint PRIMARY KEY REFERENCES posts_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX posts_post_search_document_gin ON posts_post_search USING gin (document)",
+    "CREATE FUNCTION posts_post_search_update() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN "
+    "INSERT INTO posts_post_search (post_id, document) VALUES (NEW.id, "
+    "setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B')) "
+    "ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document; "
+    "RETURN NULL; "
+    "END $$",
+    "CREATE TRIGGER posts_post_search_update AFTER INSERT OR UPDATE OF title, content ON posts_post "
+    "FOR EACH ROW EXECUTE FUNCTION posts_post_search_update()",
+    "INSERT INTO posts_post_search (post_id, document) "
+    "SELECT id, setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B') FROM posts_post",
+]
+POSTGRES_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS posts_post_search_update ON posts_post",
+    "DROP FUNCTION IF EXISTS posts_post_search_update()",
+    "DROP TABLE IF EXISTS posts_post_search",
+]
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5(title, content, tokenize = 'porter unicode61')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts (rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF title, content ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "INSERT INTO posts_post_fts (rowid, title, content) VALUES (new.id, new.title, new.content); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN "
+    "DELETE FROM posts_post_fts WHERE rowid = old.id; "
+    "END",
+    "INSERT INTO posts_post_fts (rowid, title, content) SELECT id, title, content FROM posts_post",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+
+def _execute(schema_editor, statements):
+    # Other vendors fall back to icontains and need no schema
+    for statement in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    _execute(schema_editor, {'postgresql': POSTGRES_FORWARDS, 'sqlite': SQLITE_FORWARDS})
+
+
+def drop_search_index(apps, schema_editor):
+    _execute(schema_editor, {'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_trendingpost'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
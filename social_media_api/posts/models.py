@@ -11,6 +11,16 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, maintained with F() updates by the like/comment views
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination over (created_at, id), globally and per author
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_id_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -21,6 +31,11 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.username}"
@@ -35,4 +50,52 @@ class Like(models.Model):
         unique_together = ['user', 'post']  # Prevent duplicate likes
     
     def __str__(self):
-        return f"{self.user.username} likes {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} likes {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Materialized feed row: one per (follower, post) pushed at write time.
+    created_at mirrors the post's timestamp so a timeline reads pre-sorted.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.user_id}"
+
+
+class TrendingPost(models.Model):
+    """
+    Precomputed trending score, refreshed by posts.trending.refresh().
+    rank is comparable across rows without re-decaying (see trending.py).
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    rank = models.FloatField(db_index=True)
+    likes_in_window = models.PositiveIntegerField(default=0)
+    comments_in_window = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+    # Set when a like or comment on the post is deleted, so the next refresh lowers its rank
+    needs_refresh = models.BooleanField(default=False, db_index=True)
+
+    def __str__(self):
+        return f"{self.post_id} trending at {self.rank:.2f}"
+
+
+class TrendingWatermark(models.Model):
+    """
+    Single row recording where the last trending refresh started reading,
+    shared by every process and command run.
+    """
+    watermark = models.DateTimeField()
+
+    def __str__(self):
+        return f"trending refreshed up to {self.watermark}"
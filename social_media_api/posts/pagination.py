@@ -0,0 +1,183 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    ?cursor=           switch to keyset mode, keyed on (created_at, id)
+    ?count=false       skip the COUNT(*) query in either mode
+
+    Subclasses can flip both defaults with cursor_by_default (then ?page=
+    selects page numbers) and count_by_default (then ?count=true adds it).
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    cursor_by_default = False
+    count_by_default = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        count = request.query_params.get(self.count_query_param)
+        if count is None:
+            self.include_count = self.count_by_default
+        else:
+            self.include_count = count.lower() not in ('0', 'false', 'no')
+        if self.cursor_by_default:
+            self.use_cursor = self.page_query_param not in request.query_params
+        else:
+            self.use_cursor = self.cursor_query_param in request.query_params
+
+        if not self.use_cursor:
+            if self.include_count:
+                return super().paginate_queryset(queryset, request, view)
+            return self._paginate_without_count(queryset, request)
+        return self._paginate_keyset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor and self.include_count:
+            return super().get_paginated_response(data)
+
+        payload = OrderedDict()
+        if self.include_count:
+            payload['count'] = self.total
+        payload['next'] = self.next_link
+        payload['previous'] = self.previous_link
+        payload['results'] = data
+        return Response(payload)
+
+    # Page numbers without COUNT(*)
+
+    def _paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if number > 1 and not rows:
+            raise NotFound(self.invalid_page_message)
+
+        url = request.build_absolute_uri()
+        self.next_link = replace_query_param(url, self.page_query_param, number + 1) if len(rows) > page_size else None
+        if number == 1:
+            self.previous_link = None
+        elif number == 2:
+            self.previous_link = remove_query_param(url, self.page_query_param)
+        else:
+            self.previous_link = replace_query_param(url, self.page_query_param, number - 1)
+        return rows[:page_size]
+
+    # Keyset mode
+
+    def _paginate_keyset(self, queryset, request):
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        if self.include_count:
+            self.total = queryset.count()
+
+        ordering = self.ordering if not reverse else tuple(self._flip(field) for field in self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        return self._keyset_page(list(queryset[:page_size + 1]), page_size, position, reverse)
+
+    def _keyset_page(self, rows, page_size, position, reverse):
+        """Trim the page_size + 1 rows read in the requested direction and set the links"""
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = position is not None if not reverse else has_more
+        self.next_link = self._link(rows[-1], False) if rows and has_next else None
+        self.previous_link = self._link(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def _after(self, position, reverse):
+        """Rows strictly after (created_at, id) in the requested direction"""
+        (timestamp_field, id_field) = (field.lstrip('-') for field in self.ordering)
+        descending = self.ordering[0].startswith('-') != reverse
+        lookup = 'lt' if descending else 'gt'
+        timestamp, pk = position
+        return (
+            Q(**{f'{timestamp_field}__{lookup}': timestamp}) |
+            Q(**{timestamp_field: timestamp, f'{id_field}__{lookup}': pk})
+        )
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _link(self, instance, reverse):
+        (timestamp_field, id_field) = (field.lstrip('-') for field in self.ordering)
+        position = (getattr(instance, timestamp_field), getattr(instance, id_field))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def encode_cursor(self, position, reverse):
+        timestamp, pk = position
+        raw = json.dumps([timestamp.isoformat(), pk, reverse])
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        """Return ((created_at, id), reverse) or (None, False) for the first page"""
+        if not encoded:
+            return None, False
+        try:
+            timestamp, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None:
+                raise ValueError(encoded)
+            return (timestamp, int(pk)), bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class CommentPagination(KeysetPagination):
+    """Comments read oldest first"""
+    ordering = ('created_at', 'id')
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Inboxes grow without bound, so reads stay O(page size): keyset mode and
+    no COUNT(*) unless ?page= or ?count=true is asked for explicitly
+    """
+    cursor_by_default = True
+    count_by_default = False
+
+
+class FeedPagination(KeysetPagination):
+    """
+    The feed is always read in keyset mode without a count: each page is a
+    slice of the user's timeline index (see timeline.feed_page), so the
+    view calls paginate_feed() instead of paginate_queryset().
+    """
+    cursor_by_default = True
+    count_by_default = False
+
+    def paginate_feed(self, user, request):
+        from .timeline import feed_page
+
+        self.request = request
+        self.use_cursor = True
+        self.include_count = False
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        return self._keyset_page(feed_page(user, page_size + 1, position, reverse), page_size, position, reverse)
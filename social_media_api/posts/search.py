@@ -0,0 +1,154 @@
+"""
+Full-text search over posts.
+
+The backend is picked from the database vendor (or POSTS_SEARCH_BACKEND):
+    PostgresSearchBackend   tsvector side table with a GIN index, ts_rank ranking
+    SQLiteSearchBackend     FTS5 virtual table, bm25 ranking
+    IcontainsSearchBackend  plain icontains, for anything else
+The Postgres and SQLite index tables and the triggers that keep them in
+step with posts_post are created by migration 0005_post_search, so they
+exist on every database the posts tables do. Backends without triggers can
+implement index()/remove(), called from post_save/post_delete (see
+signals.py). rebuild_search_index reindexes everything, e.g. after a restore.
+"""
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post
+
+POSTS_TABLE = Post._meta.db_table
+
+
+class BaseSearchBackend:
+    def index(self, post_id):
+        """(Re)index one post"""
+
+    def remove(self, post_id):
+        """Drop one post from the index"""
+
+    def rebuild(self):
+        """Reindex every post; returns the number of posts indexed"""
+        return Post.objects.count()
+
+    def search(self, queryset, query):
+        """Filter queryset to matches, annotated with search_rank (higher is better)"""
+        raise NotImplementedError
+
+
+class IcontainsSearchBackend(BaseSearchBackend):
+    def search(self, queryset, query):
+        matches = Q()
+        for term in query.split():
+            matches &= Q(title__icontains=term) | Q(content__icontains=term)
+        return queryset.filter(matches)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Index rows are written by the posts_post_search_update trigger; deletes cascade"""
+    table = f'{POSTS_TABLE}_search'
+    config = 'english'
+    document_sql = (
+        "setweight(to_tsvector(%(config)s, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector(%(config)s, coalesce(content, '')), 'B')"
+    )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (post_id, document) "
+                f"SELECT id, {self.document_sql} FROM {POSTS_TABLE} "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                {'config': self.config},
+            )
+            return cursor.rowcount
+
+    def search(self, queryset, query):
+        tsquery = f"websearch_to_tsquery('{self.config}', %s)"
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT post_id FROM {self.table} WHERE document @@ {tsquery}", [query])
+        ).annotate(search_rank=RawSQL(
+            f"SELECT ts_rank(document, {tsquery}) FROM {self.table} WHERE post_id = {POSTS_TABLE}.id",
+            [query],
+            output_field=FloatField(),
+        ))
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Index rows are written by the posts_post_fts_* triggers"""
+    table = f'{POSTS_TABLE}_fts'
+
+    @staticmethod
+    def to_match(query):
+        """Quote every term so user input can't use FTS5 query syntax"""
+        terms = ['"%s"' % term.replace('"', '""') for term in query.split()]
+        return ' '.join(terms)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) SELECT id, title, content FROM {POSTS_TABLE}"
+            )
+            return cursor.rowcount
+
+    def search(self, queryset, query):
+        match = self.to_match(query)
+        if not match:
+            return queryset.none()
+        # bm25() is lower-is-better; negate it so search_rank sorts like ts_rank
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        ).annotate(search_rank=RawSQL(
+            f"SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {POSTS_TABLE}.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = IcontainsSearchBackend()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'POSTS_SEARCH_BACKEND':
+        _backend = None
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    DRF filter backend: ?search=terms returns matching posts, best match first.
+    (Cursor pagination re-sorts by date, so ranking applies to page-number mode.)
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        results = get_backend().search(queryset, query)
+        if 'search_rank' in results.query.annotations:
+            results = results.order_by('-search_rank', '-created_at', '-id')
+        return results
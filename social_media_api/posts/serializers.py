@@ -1,5 +1,7 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
-from .models import Post, Comment
+from .models import Post, Comment, Like
+from .comments import full_comments_prefetch, prefetch_comment_previews
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
@@ -9,28 +11,59 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'post', 'author', 'content', 'created_at', 'updated_at']
         read_only_fields = ['author', 'post']
 
+class PostListSerializer(serializers.ListSerializer):
+    """Resolves the viewer's likes and comment previews for the whole page in one query each"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and 'liked_post_ids' not in self.context:
+            self._context['liked_post_ids'] = set(
+                Like.objects.filter(user=request.user, post_id__in=[post.pk for post in posts])
+                .values_list('post_id', flat=True)
+            )
+        prefetch_comment_previews(posts)
+        return super().to_representation(posts)
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
     comments = CommentSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
+    comments_preview = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
     user_liked = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 
-                  'comments', 'likes_count', 'user_liked']
+                  'comments', 'comments_preview', 'likes_count', 'comments_count', 'user_liked']
         read_only_fields = ['author']
+        list_serializer_class = PostListSerializer
+    
+    def get_fields(self):
+        # Lists carry a short comments_preview; single posts carry every comment
+        fields = super().get_fields()
+        if isinstance(self.parent, serializers.ListSerializer):
+            fields.pop('comments')
+        else:
+            fields.pop('comments_preview')
+        return fields
+
+    def to_representation(self, instance):
+        # Single posts (retrieve, create and update responses) load comments with their authors in one query
+        if 'comments' in self.fields:
+            prefetch_related_objects([instance], full_comments_prefetch())
+        return super().to_representation(instance)
     
-    def get_likes_count(self, obj):
-        return obj.like_set.count()
+    def get_comments_preview(self, obj):
+        prefetch_comment_previews([obj])
+        return CommentSerializer(obj.comments_preview, many=True, context=self.context).data
     
     def get_user_liked(self, obj):
+        liked_post_ids = self.context.get('liked_post_ids')
+        if liked_post_ids is not None:
+            return obj.pk in liked_post_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.like_set.filter(user=request.user).exists()
         return False
-    
-    class Meta:
-        model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 'comments']
-        read_only_fields = ['author']
\ No newline at end of file
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social_media_api.conditional import bump
+from .models import Comment, Like, Post, TrendingPost
+from . import search
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    """Reindex after commit, skipping saves that only touch counters"""
+    if update_fields and not {'title', 'content'} & set(update_fields):
+        return
+    transaction.on_commit(lambda: search.get_backend().index(instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: search.get_backend().remove(post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_post_version(sender, instance, **kwargs):
+    """Comment edits don't touch the post row, so version the post detail explicitly"""
+    bump(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+def flag_trending_post(sender, instance, **kwargs):
+    """Deleted activity only lowers a rank if the next refresh looks at the post"""
+    TrendingPost.objects.filter(post_id=instance.post_id, needs_refresh=False).update(needs_refresh=True)
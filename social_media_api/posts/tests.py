@@ -1,3 +1,363 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import likes, timeline, trending
+from .models import Comment, Like, Post, TrendingPost
+from .serializers import PostSerializer
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.other = User.objects.create_user(username='other', password='pass12345')
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=2)
+    def test_author_crossing_threshold_is_merged_at_read_time(self):
+        self.reader.follow(self.author)
+        self.assertEqual(timeline.celebrity_ids(self.reader), [])
+
+        # The second follower makes the author a celebrity: no fan-out, read-time merge
+        self.other.follow(self.author)
+        self.assertEqual(timeline.celebrity_ids(self.reader), [self.author.pk])
+        post = Post.objects.create(author=self.author, title='Hello', content='World')
+        self.assertEqual(timeline.fan_out_post(post), 0)
+        self.assertIn(post, timeline.feed_page(self.reader, 10))
+
+        self.other.unfollow(self.author)
+        self.assertEqual(timeline.celebrity_ids(self.reader), [])
+
+    @override_settings(TIMELINE_FANOUT_THRESHOLD=2)
+    def test_feed_pages_merge_timeline_and_celebrities(self):
+        celebrity = User.objects.create_user(username='celebrity', password='pass12345')
+        self.reader.follow(self.author)
+        self.reader.follow(celebrity)
+        self.other.follow(celebrity)
+        posts = []
+        for n in range(3):
+            for author in (self.author, celebrity):
+                post = Post.objects.create(author=author, title=f'{author.username} {n}', content='Content')
+                timeline.fan_out_post(post)
+                posts.append(post)
+        newest_first = posts[::-1]
+
+        with CaptureQueriesContext(connection) as queries:
+            page = timeline.feed_page(self.reader, 4)
+        self.assertEqual(page, newest_first[:4])
+        entry_reads = [q['sql'] for q in queries.captured_queries if 'posts_timelineentry' in q['sql']]
+        self.assertTrue(entry_reads)
+        # The slice is read from the timeline index alone
+        self.assertFalse(any('JOIN' in sql for sql in entry_reads))
+
+        last = page[-1]
+        self.assertEqual(timeline.feed_page(self.reader, 4, (last.created_at, last.pk)), newest_first[4:])
+        first = newest_first[4]
+        self.assertEqual(timeline.feed_page(self.reader, 2, (first.created_at, first.pk), reverse=True),
+                         [newest_first[3], newest_first[2]])
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass12345') for i in range(2)]
+        self.hot = Post.objects.create(author=self.author, title='Hot', content='Post')
+        self.warm = Post.objects.create(author=self.author, title='Warm', content='Post')
+        for fan in self.fans:
+            Like.objects.create(user=fan, post=self.hot)
+        Like.objects.create(user=self.fans[0], post=self.warm)
+
+    def ranking(self):
+        return list(TrendingPost.objects.order_by('-rank').values_list('post_id', flat=True))
+
+    def test_unlike_lowers_rank(self):
+        trending.refresh()
+        self.assertEqual(self.ranking(), [self.hot.pk, self.warm.pk])
+
+        Like.objects.filter(post=self.hot, user=self.fans[1]).delete()
+        Like.objects.create(user=self.fans[1], post=self.warm)
+        trending.refresh()
+        self.assertEqual(self.ranking(), [self.warm.pk, self.hot.pk])
+
+        Like.objects.filter(post=self.hot).delete()
+        trending.refresh()
+        self.assertEqual(self.ranking(), [self.warm.pk])
+
+    @override_settings(TRENDING_REFRESH_OVERLAP=30)
+    def test_late_commit_is_picked_up(self):
+        now = timezone.now()
+        trending.refresh(now=now)
+        # Timestamped before the refresh started, committed after it read
+        late = Post.objects.create(author=self.author, title='Late', content='Post')
+        Like.objects.create(user=self.fans[0], post=late)
+        Like.objects.filter(post=late).update(created_at=now - timedelta(seconds=10))
+        trending.refresh(now=now + timedelta(minutes=1))
+        self.assertIn(late.pk, self.ranking())
+
+    @override_settings(TRENDING_REFRESH_OVERLAP=0)
+    def test_watermark_survives_the_cache(self):
+        now = timezone.now()
+        self.assertEqual(trending.refresh(now=now), (2, 0))
+        cache.clear()  # another worker, or a new command run
+        self.assertEqual(trending.refresh(now=now), (0, 0))
+        Like.objects.create(user=self.fans[1], post=self.warm)
+        self.assertEqual(trending.refresh(), (1, 0))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {n}', content='Content') for n in range(25)]
+        # Ten posts share a timestamp, so pages must break ties on id
+        tied = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[5:15]]).update(created_at=tied)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def expected(self):
+        return list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url, direction='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([post['id'] for post in response.data['results']])
+            url = response.data[direction]
+        return pages, response
+
+    def test_cursor_pages_cover_every_post_once_in_order(self):
+        pages, _ = self.walk(reverse('post-list') + '?cursor=')
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([pk for page in pages for pk in page], self.expected())
+
+    def test_previous_links_walk_back(self):
+        forward, last = self.walk(reverse('post-list') + '?cursor=')
+        back, _ = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(back, forward[-2::-1])
+
+    def test_count_is_optional(self):
+        self.assertNotIn('count', self.client.get(reverse('post-list') + '?cursor=&count=false').data)
+        self.assertEqual(self.client.get(reverse('post-list') + '?cursor=').data['count'], 25)
+
+    def test_bad_cursor_is_not_found(self):
+        for cursor in ('garbage', 'W10=', 'WyJub3QgYSBkYXRlIiwgMSwgZmFsc2Vd'):
+            self.assertEqual(self.client.get(reverse('post-list'), {'cursor': cursor}).status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hello', content='World')
+        self.client = APIClient()
+        self.client.force_authenticate(self.fan)
+
+    def counters(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count, self.post.comments_count
+
+    def test_likes_and_comments_move_the_counters(self):
+        self.client.post(reverse('like', args=[self.post.pk]))
+        response = self.client.post(reverse('post-comments', args=[self.post.pk]), {'content': 'Nice'})
+        self.assertEqual(self.counters(), (1, 1))
+
+        self.client.post(reverse('unlike', args=[self.post.pk]))
+        self.client.delete(reverse('post-comment-detail', args=[self.post.pk, response.data['id']]))
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_counters_never_go_negative(self):
+        self.client.post(reverse('unlike', args=[self.post.pk]))
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_recount_repairs_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Comment.objects.create(post=self.post, author=self.fan, content='Nice')
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=0)
+
+        out = StringIO()
+        call_command('recount_post_counters', '--dry-run', stdout=out)
+        self.assertIn('would fix 1', out.getvalue())
+        self.assertEqual(self.counters(), (7, 0))
+
+        call_command('recount_post_counters', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 1))
+
+
+class LikedPostIdsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.viewer = User.objects.create_user(username='viewer', password='pass12345')
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {n}', content='Content') for n in range(10)]
+        for post in self.posts[::2]:
+            Like.objects.create(user=self.viewer, post=post)
+        request = APIRequestFactory().get('/')
+        request.user = self.viewer
+        self.context = {'request': request}
+
+    def serialize(self, posts):
+        return PostSerializer(Post.objects.filter(pk__in=[p.pk for p in posts]).select_related('author')
+                              .order_by('id'), many=True, context=dict(self.context)).data
+
+    def test_likes_resolved_once_per_page(self):
+        # posts, the viewer's likes, comment previews: the same for any page size
+        with self.assertNumQueries(3):
+            data = self.serialize(self.posts[:2])
+        with self.assertNumQueries(3):
+            data = self.serialize(self.posts)
+        self.assertEqual([entry['user_liked'] for entry in data], [n % 2 == 0 for n in range(10)])
+
+    def test_single_post_checks_its_own_like(self):
+        data = PostSerializer(self.posts[1], context=self.context).data
+        self.assertFalse(data['user_liked'])
+        self.assertTrue(PostSerializer(self.posts[0], context=self.context).data['user_liked'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.in_title = Post.objects.create(author=self.author, title='Django tips', content='Short read')
+        self.in_content = Post.objects.create(author=self.author, title='Notes', content='Mostly about django')
+        self.other = Post.objects.create(author=self.author, title='Gardening', content='Tomatoes')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def search(self, query):
+        response = self.client.get(reverse('post-list'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.data['results']]
+
+    def test_title_matches_rank_above_content_matches(self):
+        self.assertEqual(self.search('django'), [self.in_title.pk, self.in_content.pk])
+        self.assertEqual(self.search('tip'), [self.in_title.pk])
+        self.assertEqual(self.search('django tomatoes'), [])
+
+    def test_edits_and_deletes_update_the_index(self):
+        response = self.client.patch(reverse('post-detail', args=[self.other.pk]), {'content': 'Django on the allotment'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('tomatoes'), [])
+        self.assertIn(self.other.pk, self.search('django'))
+
+        self.client.delete(reverse('post-detail', args=[self.in_title.pk]))
+        self.assertEqual(self.search('tips'), [])
+        self.assertNotIn(self.in_title.pk, self.search('django'))
+
+    def test_rebuild_reindexes_every_post(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 posts', out.getvalue())
+        self.assertEqual(self.search('gardening'), [self.other.pk])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LikeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Hello', content='World')
+        self.client = APIClient()
+        self.client.force_authenticate(self.fan)
+
+    def likes_count(self):
+        return Post.objects.get(pk=self.post.pk).likes_count
+
+    def test_double_like_is_a_no_op(self):
+        self.assertEqual(self.client.post(reverse('like', args=[self.post.pk])).status_code, 200)
+        self.assertEqual(self.client.post(reverse('like', args=[self.post.pk])).status_code, 400)
+        self.assertEqual((Like.objects.count(), self.likes_count()), (1, 1))
+
+    def test_upsert_stores_created_at_like_the_orm(self):
+        before = timezone.now()
+        self.assertTrue(likes.like(self.fan, self.post))
+        Like.objects.create(user=self.author, post=self.post)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT CAST(created_at AS TEXT) FROM {Like._meta.db_table} ORDER BY id")
+            upserted, orm = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(upserted.endswith('+00:00'), orm.endswith('+00:00'))
+        self.assertEqual(Like.objects.filter(created_at__gte=before).count(), 2)
+        self.assertEqual(list(Like.objects.order_by('created_at').values_list('user', flat=True)),
+                         [self.fan.pk, self.author.pk])
+
+    def test_fallback_without_returning(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.assertTrue(likes.like(self.fan, self.post))
+            self.assertFalse(likes.like(self.fan, self.post))
+        self.assertEqual(self.likes_count(), 1)
+
+    def test_unlike_flags_trending_post(self):
+        likes.like(self.fan, self.post)
+        TrendingPost.objects.create(post=self.post, rank=1.0, last_activity_at=timezone.now())
+        self.assertTrue(likes.unlike(self.fan, self.post))
+        self.assertFalse(likes.unlike(self.fan, self.post))
+        self.assertEqual(self.likes_count(), 0)
+        self.assertTrue(TrendingPost.objects.get(post=self.post).needs_refresh)
+
+    def test_idempotency_key_replays_the_first_response(self):
+        url = reverse('like', args=[self.post.pk])
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='tap-1')
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='tap-1')
+        self.assertEqual((first.status_code, retry.status_code), (200, 200))
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.likes_count(), 1)
+        # A new key is a new request
+        self.assertEqual(self.client.post(url, HTTP_IDEMPOTENCY_KEY='tap-2').status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_COMMENTS_PREVIEW_SIZE=2)
+class CommentPreviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.commenters = [User.objects.create_user(username=f'commenter{i}', password='pass12345') for i in range(4)]
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {n}', content='Content') for n in range(6)]
+        for post in self.posts:
+            for commenter in self.commenters:
+                Comment.objects.create(post=post, author=commenter, content=f'From {commenter.username}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_list_previews_take_one_query_per_page(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.author
+        # posts, the viewer's likes, comment previews
+        with self.assertNumQueries(3):
+            data = PostSerializer(Post.objects.select_related('author').order_by('id'), many=True,
+                                  context={'request': request}).data
+        self.assertEqual([[c['author'] for c in post['comments_preview']] for post in data],
+                         [['commenter2', 'commenter3']] * len(self.posts))
+        self.assertNotIn('comments', data[0])
+
+    def patch(self, post):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(reverse('post-detail', args=[post.pk]), {'title': 'Edited'})
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_update_response_does_not_query_per_comment(self):
+        response, with_comments = self.patch(self.posts[0])
+        self.assertEqual([c['author'] for c in response.data['comments']], [u.username for u in self.commenters])
+        empty = Post.objects.create(author=self.author, title='Quiet', content='Post')
+        response, without_comments = self.patch(empty)
+        self.assertEqual(response.data['comments'], [])
+        self.assertEqual(with_comments, without_comments)
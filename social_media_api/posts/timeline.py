@@ -0,0 +1,182 @@
+"""
+Fan-out-on-write timelines.
+
+New posts are pushed into each follower's TimelineEntry rows, so a feed
+page is one slice of the (user, -created_at, -post) index followed by a
+primary-key lookup of those posts. Authors with TIMELINE_FANOUT_THRESHOLD
+or more followers ("celebrities") aren't pushed; their posts are read from
+Post's (author, -created_at, -id) index and merged into the page.
+
+Which authors count as celebrities is cached under the user's follow-graph
+version and a global epoch. Both live in the default cache, so processes
+only see each other's invalidations through a shared cache (REDIS_URL);
+`manage.py check --deploy` warns when the cache is process-local.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from accounts import graph
+
+from .models import Post, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+CELEBRITY_EPOCH_KEY = 'timeline:celebrities:epoch'
+
+
+def _follows():
+    # Resolved on use: the user model isn't importable at module load
+    return get_user_model().followers.through
+
+
+def fanout_threshold():
+    """Follower count at which an author switches to fan-out-on-read"""
+    return getattr(settings, 'TIMELINE_FANOUT_THRESHOLD', 5000)
+
+
+def follower_ids(author):
+    """IDs of users following the author (rows in the self-referential M2M)"""
+    return _follows().objects.filter(to_customuser=author).values_list('from_customuser_id', flat=True)
+
+
+def is_celebrity(author):
+    """True if the author has too many followers to push posts to"""
+    return follower_ids(author)[:fanout_threshold()].count() >= fanout_threshold()
+
+
+def _celebrity_epoch():
+    # Seed with a timestamp so an evicted epoch never reuses an old number
+    cache.add(CELEBRITY_EPOCH_KEY, time.time_ns(), None)
+    return cache.get(CELEBRITY_EPOCH_KEY)
+
+
+def followers_changed(author_ids, followed):
+    """
+    Call after authors gain (followed=True) or lose a follower. If one of
+    them crossed the fan-out threshold, every cached celebrity set is
+    dropped, so feeds start (or stop) merging that author at read time.
+    """
+    crossing = fanout_threshold() if followed else fanout_threshold() - 1
+    crossed = crossing <= 0 or (
+        _follows().objects.filter(to_customuser__in=list(author_ids))
+        .values('to_customuser')
+        .annotate(num_followers=Count('id'))
+        .filter(num_followers=crossing)
+        .exists()
+    )
+    if crossed:
+        try:
+            cache.incr(CELEBRITY_EPOCH_KEY)
+        except ValueError:
+            cache.set(CELEBRITY_EPOCH_KEY, time.time_ns(), None)
+
+
+def celebrity_ids(user):
+    """
+    IDs of followed authors whose posts are read at query time. Cached; the
+    key changes when the user follows or unfollows someone and when any
+    author crosses the threshold (followers_changed()).
+    """
+    key = f'timeline:celebrities:{_celebrity_epoch()}:{user.pk}:{graph.version(user)}'
+    ids = cache.get(key)
+    if ids is None:
+        Follow = _follows()
+        followed = Follow.objects.filter(from_customuser=user).values('to_customuser')
+        ids = list(
+            Follow.objects.filter(to_customuser__in=followed)
+            .values('to_customuser')
+            .annotate(num_followers=Count('id'))
+            .filter(num_followers__gte=fanout_threshold())
+            .values_list('to_customuser', flat=True)
+        )
+        cache.set(key, ids, getattr(settings, 'TIMELINE_CELEBRITY_CACHE_TTL', 300))
+    return ids
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Push a new post into every follower's timeline (skipped for celebrities)"""
+    if is_celebrity(post.author):
+        return 0
+
+    pushed = 0
+    batch = []
+    for user_id in follower_ids(post.author).iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(TimelineEntry(user_id=user_id, post=post, created_at=post.created_at))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            _bulk_insert(batch)
+            pushed += len(batch)
+            batch = []
+    if batch:
+        _bulk_insert(batch)
+        pushed += len(batch)
+    return pushed
+
+
+def backfill(user, author):
+    """Copy an author's recent posts into a new follower's timeline"""
+    limit = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)
+    posts = Post.objects.filter(author=author).order_by('-created_at', '-id')[:limit]
+    _bulk_insert([TimelineEntry(user=user, post=post, created_at=post.created_at) for post in posts])
+
+
+def backfill_many(user, author_ids):
+    """backfill() for several newly followed authors in one query"""
+    limit = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 50)
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=[F('author_id')], order_by=[F('created_at').desc(), F('id').desc()]))
+        .filter(rank__lte=limit)
+        .only('id', 'created_at')
+    )
+    _bulk_insert([TimelineEntry(user=user, post=post, created_at=post.created_at) for post in posts])
+
+
+def purge(user, author):
+    """Drop an unfollowed author's posts from the user's timeline"""
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def purge_many(user, author_ids):
+    TimelineEntry.objects.filter(user=user, post__author_id__in=author_ids).delete()
+
+
+def _past(position, reverse, id_field):
+    """Rows strictly past position=(created_at, id) in the reading direction"""
+    if position is None:
+        return Q()
+    lookup = 'gt' if reverse else 'lt'
+    timestamp, pk = position
+    return Q(**{f'created_at__{lookup}': timestamp}) | Q(created_at=timestamp, **{f'{id_field}__{lookup}': pk})
+
+
+def feed_page(user, limit, position=None, reverse=False):
+    """
+    Up to limit posts of the user's feed past position=(created_at, post id),
+    newest first (oldest first with reverse). Each source is read as one
+    slice of its index; the two slices are merged by (created_at, id).
+    """
+    direction = '' if reverse else '-'
+    keys = list(
+        TimelineEntry.objects.filter(_past(position, reverse, 'post_id'), user=user)
+        .order_by(f'{direction}created_at', f'{direction}post_id')
+        .values_list('created_at', 'post_id')[:limit]
+    )
+    celebrities = celebrity_ids(user)
+    if celebrities:
+        keys += (
+            Post.objects.filter(_past(position, reverse, 'id'), author_id__in=celebrities)
+            .order_by(f'{direction}created_at', f'{direction}id')
+            .values_list('created_at', 'id')[:limit]
+        )
+        # A post pushed before its author crossed the threshold is in both
+        keys = sorted(set(keys), reverse=not reverse)[:limit]
+    posts = Post.objects.select_related('author').in_bulk([pk for _, pk in keys])
+    return [posts[pk] for _, pk in keys if pk in posts]
@@ -0,0 +1,141 @@
+"""
+Trending score.
+
+Each like/comment contributes weight * 2 ** ((t - EPOCH) / half_life), i.e.
+an exponentially decaying value expressed relative to a fixed epoch instead
+of "now". Because every post decays at the same rate, ordering by that sum
+gives the same result at any moment, so a refresh only has to recompute
+posts with new activity, plus posts flagged needs_refresh because a like
+or comment was deleted (see signals.py). The sum is stored as log2
+(TrendingPost.rank) to stay within float range.
+
+The watermark is the refresh's start time minus TRENDING_REFRESH_OVERLAP
+seconds, so likes and comments whose transaction commits late are still
+picked up by the next refresh. It is stored in the database
+(TrendingWatermark) so every worker and command run continues where the
+last one stopped instead of rescanning the whole window.
+
+Events are aggregated per hour bucket inside a sliding window
+(TRENDING_WINDOW_HOURS); posts with no activity in the window drop out.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Comment, Like, TrendingPost, TrendingWatermark
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+WATERMARK_ID = 1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def log2_contribution(weight, count, at):
+    """log2 of weight * count * 2 ** ((at - EPOCH) / half_life)"""
+    half_life = _setting('TRENDING_HALF_LIFE_HOURS', 6) * 3600
+    return math.log2(weight * count) + (at - EPOCH).total_seconds() / half_life
+
+
+def log2_sum(values):
+    """log2(sum(2 ** v)) without overflow"""
+    top = max(values)
+    return top + math.log2(sum(2 ** (v - top) for v in values))
+
+
+def _hourly(model, post_ids, since):
+    rows = (
+        model.objects.filter(post_id__in=post_ids, created_at__gte=since)
+        .annotate(hour=TruncHour('created_at'))
+        .values('post_id', 'hour')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    buckets = defaultdict(list)
+    for row in rows:
+        buckets[row['post_id']].append((row['hour'], row['n']))
+    return buckets
+
+
+def _latest(model, post_ids, since):
+    return dict(
+        model.objects.filter(post_id__in=post_ids, created_at__gte=since)
+        .values('post_id').annotate(at=Max('created_at'))
+        .values_list('post_id', 'at').order_by()
+    )
+
+
+def _active_post_ids(since):
+    ids = set(Like.objects.filter(created_at__gte=since).values_list('post_id', flat=True).distinct())
+    ids |= set(Comment.objects.filter(created_at__gte=since).values_list('post_id', flat=True).distinct())
+    return ids
+
+
+def refresh(now=None, batch_size=500):
+    """
+    Recompute scores for posts liked or commented on since the last refresh
+    or flagged by a delete, and drop posts whose activity has left the window.
+    Returns (updated, removed).
+    """
+    now = now or timezone.now()
+    window_start = now - timedelta(hours=_setting('TRENDING_WINDOW_HOURS', 48))
+    watermark = TrendingWatermark.objects.filter(pk=WATERMARK_ID).values_list('watermark', flat=True).first()
+    since = max(watermark or window_start, window_start)
+    like_weight = _setting('TRENDING_LIKE_WEIGHT', 1.0)
+    comment_weight = _setting('TRENDING_COMMENT_WEIGHT', 2.0)
+
+    # Clear the flags before reading, so a delete landing mid-refresh flags the post again
+    flagged = list(TrendingPost.objects.filter(needs_refresh=True).values_list('post_id', flat=True))
+    if flagged:
+        TrendingPost.objects.filter(post_id__in=flagged).update(needs_refresh=False)
+
+    active = sorted(_active_post_ids(since) | set(flagged))
+    updated = 0
+    emptied = []
+    for start in range(0, len(active), batch_size):
+        post_ids = active[start:start + batch_size]
+        likes = _hourly(Like, post_ids, window_start)
+        comments = _hourly(Comment, post_ids, window_start)
+        latest = _latest(Like, post_ids, window_start)
+        for post_id, at in _latest(Comment, post_ids, window_start).items():
+            latest[post_id] = max(at, latest.get(post_id, at))
+
+        rows = []
+        for post_id in post_ids:
+            contributions = [log2_contribution(like_weight, n, hour) for hour, n in likes.get(post_id, ())]
+            contributions += [log2_contribution(comment_weight, n, hour) for hour, n in comments.get(post_id, ())]
+            if not contributions:
+                # Everything in the window was deleted
+                emptied.append(post_id)
+                continue
+            rows.append(TrendingPost(
+                post_id=post_id,
+                rank=log2_sum(contributions),
+                likes_in_window=sum(n for _, n in likes.get(post_id, ())),
+                comments_in_window=sum(n for _, n in comments.get(post_id, ())),
+                last_activity_at=latest[post_id],
+                refreshed_at=now,
+            ))
+
+        with transaction.atomic():
+            TrendingPost.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['post'],
+                update_fields=['rank', 'likes_in_window', 'comments_in_window', 'last_activity_at', 'refreshed_at'],
+            )
+        updated += len(rows)
+
+    removed, _ = TrendingPost.objects.filter(
+        Q(last_activity_at__lt=window_start) | Q(post_id__in=emptied)
+    ).delete()
+    overlap = timedelta(seconds=_setting('TRENDING_REFRESH_OVERLAP', 30))
+    TrendingWatermark.objects.update_or_create(pk=WATERMARK_ID, defaults={'watermark': now - overlap})
+    return updated, removed
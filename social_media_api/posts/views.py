@@ -1,190 +1,124 @@
 from django.shortcuts import render
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
-from .models import Like
-from notifications.models import Notification
+from . import likes, timeline
+from .idempotency import idempotent
+from .pagination import KeysetPagination, CommentPagination, FeedPagination
+from .search import FullTextSearchFilter
+from notifications.pipeline import notify
 from rest_framework import generics
+from rest_framework.pagination import PageNumberPagination
+from django.db import transaction
+from django.db.models import F
+from social_media_api.conditional import ConditionalResponseMixin, versions
 
 # Create your views here.
 
-class LikeView(generics.GenericAPIView):
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        ["generics.get_object_or_404(Post, pk=pk)"]
-        
-        # Check if already liked
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        
-        if not created:
-            return Response({'error': 'You already liked this post'}, status=400)
-        
-        # Create notification if user likes someone else's post
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",
-                target_post=post
-            )
-        
-        return Response({'message': 'Post liked successfully'})
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return obj.author == request.user
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalResponseMixin, viewsets.ModelViewSet):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['title', 'content']
-    
-    def get_queryset(self):
-        return Post.objects.all().order_by('-created_at')
-    
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+    pagination_class = KeysetPagination
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
 
-class CommentViewSet(viewsets.ModelViewSet):
-    serializer_class = CommentSerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwner]
-    
     def get_queryset(self):
-        post_id = self.kwargs.get('post_id')
-        return Comment.objects.filter(post_id=post_id).order_by('created_at')
-    
+        return Post.objects.select_related('author').order_by('-created_at', '-id')
+
+    def retrieve(self, request, *args, **kwargs):
+        # Version from the row itself (edits, like/comment counters) plus comment edits and the author's profile
+        post = self.get_object()
+        parts = [post.pk, post.updated_at.isoformat(), post.likes_count, post.comments_count, request.user.pk,
+                 *versions(f'post:{post.pk}', f'user:{post.author_id}')]
+
+        def render_post():
+            return Response(self.get_serializer(post).data)
+
+        return self.conditional_response(request, parts, render_post)
+
     def perform_create(self, serializer):
-        post_id = self.kwargs.get('post_id')
-        post = Post.objects.get(id=post_id)
-        comment = serializer.save(author=self.request.user, post_id=post_id)
-        
-        # Create notification if user comments on someone else's post
-        if post.author != self.request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=self.request.user,
-                verb="commented on your post",
-                target_post=post,
-                target_comment=comment
-            )
-
-
-
-class PostViewSet(viewsets.ModelViewSet):
-    # ... existing code ...
-    
-    @action(detail=False, methods=['get'])
-    def feed(self, request):
-        # Get users that the current user follows
-        following_users = request.user.followers.all()
-        
-        # Get posts from followed users
-        feed_posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
-        
-        # Paginate results
-        page = self.paginate_queryset(feed_posts)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(feed_posts, many=True)
-        return Response(serializer.data)
+        post = serializer.save(author=self.request.user)
 
-class LikeView(generics.GenericAPIView):
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def post(self, request, pk):
-        post = get_object_or_404(Post, id=pk)
-        
-        # Check if already liked
-        if Like.objects.filter(user=request.user, post=post).exists():
-            return Response({'error': 'You already liked this post'}, status=400)
-        
-        # Create like
-        Like.objects.create(user=request.user, post=post)
-        
-        # Create notification if user likes someone else's post
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",
-                target_post=post
-            )
-        
-        return Response({'message': 'Post liked successfully'})
+        # Push the new post into followers' timelines
+        timeline.fan_out_post(post)
 
-class UnlikeView(generics.GenericAPIView):
-    permission_classes = [permissions.IsAuthenticated]
-    
-    def post(self, request, pk):
-        post = get_object_or_404(Post, id=pk)
-        
-        try:
-            like = Like.objects.get(user=request.user, post=post)
-            like.delete()
-            return Response({'message': 'Post unliked successfully'})
-        except Like.DoesNotExist:
+    @action(detail=False, methods=['get'], pagination_class=PageNumberPagination)
+    def trending(self, request):
+        # Served from the precomputed TrendingPost table (see trending.py)
+        trending_posts = (
+            Post.objects.filter(trending__isnull=False)
+            .select_related('author')
+            .order_by('-trending__rank')
+        )
 
-            return Response({'error': 'You have not liked this post'}, status=400)
+        page = self.paginate_queryset(trending_posts)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
-class IsOwner(permissions.BasePermission):
-    def has_object_permission(self, request, view, obj):
-        return obj.author == request.user
+        serializer = self.get_serializer(trending_posts, many=True)
+        return Response(serializer.data)
 
-class PostViewSet(viewsets.ModelViewSet):
-    serializer_class = PostSerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwner]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['title', 'content']
-    
-    def get_queryset(self):
-        return Post.objects.all().order_by('-created_at')
-    
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+    @action(detail=False, methods=['get'], pagination_class=FeedPagination)
+    def feed(self, request):
+        # One slice of the user's materialized timeline per page
+        page = self.paginator.paginate_feed(request.user, request)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
-    
+    pagination_class = CommentPagination
+
     def get_queryset(self):
         post_id = self.kwargs.get('post_id')
         if post_id:
-            return Comment.objects.filter(post_id=post_id).order_by('created_at')
-        return Comment.objects.all().order_by('created_at')
-    
+            return Comment.objects.filter(post_id=post_id).select_related('author').order_by('created_at', 'id')
+        return Comment.objects.select_related('author').order_by('created_at', 'id')
+
     def perform_create(self, serializer):
         post_id = self.kwargs.get('post_id')
-        serializer.save(author=self.request.user, post_id=post_id)
+        post = get_object_or_404(Post, id=post_id)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user, post_id=post_id)
+            Post.objects.filter(pk=post.pk).update(comments_count=F('comments_count') + 1)
+
+        # Notify the post author (delivered in the background, coalesced)
+        notify(post.author, self.request.user, "commented on your post",
+               target_post=post, target_comment=comment)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(comments_count=F('comments_count') - 1)
 
 class LikeView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
-    
+
+    @idempotent
     def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-        
-        # Check if already liked
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        
-        if not created:
+        post = get_object_or_404(Post.objects.select_related('author'), pk=pk)
+
+        if not likes.like(request.user, post):
             return Response({'error': 'You already liked this post'}, status=400)
-        
-        # Create notification if user likes someone else's post
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",
-                target_post=post
-            )
-        
+
         return Response({'message': 'Post liked successfully'})
 
+class UnlikeView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
+    def post(self, request, pk):
+        post = get_object_or_404(Post, id=pk)
+
+        if not likes.unlike(request.user, post):
+            return Response({'error': 'You have not liked this post'}, status=400)
+        return Response({'message': 'Post unliked successfully'})
@@ -0,0 +1,88 @@
+"""
+Conditional GET and response caching keyed by resource version.
+
+A view builds a version from cheap inputs (a row's updated_at and
+counters, plus cache-held version numbers bumped by signals and the
+follow graph), which becomes a strong ETag. A matching If-None-Match is
+answered with 304 before any serializer runs; otherwise the serialized
+data is cached under the ETag, so other clients of the same version skip
+serialization too. Nothing has to be deleted on writes: a write changes
+the version, and old entries expire after RESPONSE_CACHE_TTL.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(scope):
+    return f'resource_version:{scope}'
+
+
+def versions(*scopes):
+    """Current version numbers for the given scopes, e.g. 'post:12'"""
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Seed with a timestamp so an evicted version never reuses an old number
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        found.update(cache.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate every response that depends on these scopes"""
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), None)
+
+
+def make_etag(parts):
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    # If-None-Match uses weak comparison
+    candidates = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)]
+    return '*' in candidates or etag in candidates
+
+
+class ConditionalResponseMixin:
+    """
+    For DRF views: conditional_response(request, parts, render) returns 304
+    if the client has the current version, cached data if another client
+    fetched it, and otherwise calls render() and caches its 200 response.
+    """
+
+    def conditional_response(self, request, parts, render):
+        etag = make_etag([type(self).__name__, *parts])
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'response_cache:{etag}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = render()
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TTL', 300))
+        response['ETag'] = etag
+        # Per-viewer content: shared caches must not reuse it, clients must revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
@@ -0,0 +1,119 @@
+"""
+Read-replica routing.
+
+Replicas are listed in DATABASE_REPLICAS (built from DATABASE_REPLICA_URLS
+in settings). ReplicaRoutingMiddleware marks safe-method requests to the
+posts, notifications and accounts views as replica-eligible, and
+ReplicaRouter then sends their reads of those apps' models to a random
+replica. Everything else (sessions, auth tokens, reads inside a
+transaction) uses the primary.
+
+Read-your-writes: once a client makes an unsafe (writing) request, its
+requests are pinned to the primary for DATABASE_REPLICA_PIN_SECONDS. The
+pin is kept in the cache under the client's credentials and mirrored in a
+short-lived cookie, so it holds whichever process serves the next request.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_APPS = ('posts', 'notifications', 'accounts')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin'
+
+
+class RequestRouting:
+    # Mutable so process_view can flip it even when run in a copied context (ASGI)
+    def __init__(self):
+        self.use_replica = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+
+
+def client_key(request):
+    """Identify the client by its credentials (token or session), hashed"""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'db:pinned:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def is_pinned(request):
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = client_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+def pin(request, response):
+    key = client_key(request)
+    if key is not None:
+        cache.set(key, 1, pin_seconds())
+    response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True,
+                        secure=settings.SESSION_COOKIE_SECURE, samesite='Lax')
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica:
+            return None
+        # Sessions, tokens etc. are read right after being written; keep them on the primary
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        aliases = replicas()
+        return random.choice(aliases) if aliases else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _state.set(RequestRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if request.method not in SAFE_METHODS:
+            pin(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is None or not replicas() or request.method not in SAFE_METHODS:
+            return None
+        app_label = view_func.__module__.split('.')[0]
+        if app_label in REPLICA_APPS and not is_pinned(request):
+            state.use_replica = True
+        return None
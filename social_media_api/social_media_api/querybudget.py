@@ -0,0 +1,202 @@
+"""
+Per-request SQL instrumentation.
+
+QueryBudgetMiddleware records, for every request, the number of queries,
+total SQL time and queries repeated with the same fingerprint (the usual
+sign of an N+1), and aggregates them per view in this process. In DEBUG
+(or with QUERY_BUDGET_HEADERS = True) the numbers are added as X-Query-*
+response headers; admins can read the aggregates at /api/metrics/queries/.
+
+Budgets live in QUERY_BUDGETS, keyed by "<METHOD> <view name>", e.g.
+{'GET post-list': 6}. Requests over budget are logged, and tests can
+assert them:
+
+    with QueryBudget() as budget:
+        client.get('/api/posts/')
+    budget.assert_within(6)
+
+or, for responses that went through the middleware,
+assert_query_budget(response).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Normalize a query so repeats with different parameters compare equal"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _LITERAL.sub('?', sql)
+
+
+def view_key(request):
+    match = getattr(request, 'resolver_match', None)
+    name = match.view_name if match is not None else 'unresolved'
+    return f'{request.method} {name}'
+
+
+class QueryBudget:
+    """
+    Records every query run on any database connection inside the block.
+    Only queries made from the current thread are seen.
+    """
+
+    def __init__(self):
+        self.queries = []  # (alias, sql, seconds)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._wrapper(connection.alias)))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append((alias, sql, time.perf_counter() - start))
+        return record
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def duplicates(self):
+        """{fingerprint: times run} for fingerprints seen more than once"""
+        counts = Counter(fingerprint(sql) for _, sql, _ in self.queries)
+        return {sql: n for sql, n in counts.items() if n > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(n - 1 for n in self.duplicates().values())
+
+    def assert_within(self, max_queries, allow_duplicates=True):
+        problems = []
+        if self.count > max_queries:
+            problems.append(f"{self.count} queries, budget is {max_queries}")
+        if not allow_duplicates and self.duplicate_count:
+            problems.append(f"{self.duplicate_count} duplicate queries")
+        if problems:
+            details = '\n'.join(f"  {n}x {sql}" for sql, n in self.duplicates().items())
+            raise AssertionError('; '.join(problems) + (f"\nRepeated:\n{details}" if details else ''))
+
+
+def budget_for(key):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(key)
+
+
+def assert_query_budget(response, max_queries=None, allow_duplicates=True):
+    """Check a test-client response against max_queries or its QUERY_BUDGETS entry"""
+    budget = getattr(response, 'query_budget', None)
+    if budget is None:
+        raise AssertionError("Response was not recorded; is QueryBudgetMiddleware installed?")
+    if max_queries is None:
+        max_queries = budget_for(response.query_budget_key)
+        if max_queries is None:
+            raise AssertionError(f"No QUERY_BUDGETS entry for {response.query_budget_key!r}")
+    budget.assert_within(max_queries, allow_duplicates)
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.duplicates = 0
+        self.over_budget = 0
+        self.top_duplicates = Counter()
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'queries_per_request': self.queries / requests,
+            'max_queries': self.max_queries,
+            'sql_ms_per_request': self.seconds * 1000 / requests,
+            'duplicates_per_request': self.duplicates / requests,
+            'over_budget': self.over_budget,
+            'top_duplicates': [
+                {'fingerprint': sql, 'count': n} for sql, n in self.top_duplicates.most_common(5)
+            ],
+        }
+
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(ViewStats)
+
+
+def record(key, budget):
+    limit = budget_for(key)
+    over = limit is not None and budget.count > limit
+    duplicates = budget.duplicates()
+    with _stats_lock:
+        stats = _stats[key]
+        stats.requests += 1
+        stats.queries += budget.count
+        stats.max_queries = max(stats.max_queries, budget.count)
+        stats.seconds += budget.seconds
+        stats.duplicates += budget.duplicate_count
+        stats.over_budget += over
+        stats.top_duplicates.update(duplicates)
+    if over:
+        logger.warning("%s ran %d queries (budget %d)", key, budget.count, limit)
+
+
+def snapshot():
+    with _stats_lock:
+        return {key: stats.as_dict() for key, stats in sorted(_stats.items())}
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryBudget() as budget:
+            response = self.get_response(request)
+        key = view_key(request)
+        record(key, budget)
+
+        response.query_budget = budget
+        response.query_budget_key = key
+        if getattr(settings, 'QUERY_BUDGET_HEADERS', settings.DEBUG):
+            response['X-Query-Count'] = str(budget.count)
+            response['X-Query-Time-Ms'] = f'{budget.seconds * 1000:.1f}'
+            response['X-Query-Duplicates'] = str(budget.duplicate_count)
+        return response
+
+
+class QueryMetricsView(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(snapshot())
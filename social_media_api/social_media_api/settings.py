@@ -28,7 +28,7 @@ SECRET_KEY = 'django-insecure-vz-^kj@ffr=fz+2@mm0i#%80fiu^a%rw$2*v2gnzba+@-!*xzh
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
-ALLOWED_HOSTS = [['your-domain.com', 'localhost', '127.0.0.1'] ]
+ALLOWED_HOSTS = ['your-domain.com', 'localhost', '127.0.0.1']
 
 
 # Application definition
@@ -46,14 +46,18 @@ INSTALLED_APPS = [
     'django_filters',
     'rest_framework',
     'notifications',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'social_media_api.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'social_media_api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.graph.FollowGraphMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -102,6 +106,39 @@ DATABASES = {
     )
 }
 
+# Read replicas: comma-separated URLs, e.g.
+# DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 (any dj_database_url URL).
+# Safe-method list/retrieve requests read from them; see social_media_api/db_router.py
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=600)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['social_media_api.db_router.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = 5  # read-your-writes window after a client writes
+
+
+# Cache (unread counters, timeline lookups). Set REDIS_URL to share it
+# between processes; the local-memory fallback is per process, so version
+# bumps (follow graph, celebrity epoch) only reach the process that made
+# them. Use it for development and tests only; check --deploy warns.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -144,15 +181,82 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+AUTH_USER_MODEL = 'accounts.CustomUser'
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'accounts.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
     ],
 }
 
+# Feed timelines: authors with at least this many followers are not fanned
+# out on write; their posts are merged into feeds at read time instead.
+TIMELINE_FANOUT_THRESHOLD = int(os.environ.get('TIMELINE_FANOUT_THRESHOLD', 5000))
+TIMELINE_BACKFILL_SIZE = 50
+TIMELINE_CELEBRITY_CACHE_TTL = 300
+POSTS_COMMENTS_PREVIEW_SIZE = 3  # most recent comments inlined per post in list responses
+
+# Per-user following sets, cached under a version bumped by follow()/unfollow()
+FOLLOW_GRAPH_CACHE_TTL = 600
+BULK_FOLLOW_MAX_USERS = 200
+
+# Trending posts (refresh with `manage.py refresh_trending --loop`)
+TRENDING_WINDOW_HOURS = 48
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_REFRESH_OVERLAP = 30  # seconds re-scanned each refresh for late commits
+
+# Responses to POSTs carrying an Idempotency-Key header are replayed for retries
+IDEMPOTENCY_KEY_TTL = 24 * 3600  # seconds
+
+# Token -> user resolution cache (accounts.authentication)
+AUTH_TOKEN_LOCAL_TTL = 30  # seconds; bounds staleness in other processes
+AUTH_TOKEN_LOCAL_MAX_SIZE = 10000
+AUTH_TOKEN_SHARED_TTL = 300  # seconds
+
+# ETag/conditional GET for post detail, profile and follower lists
+# (social_media_api.conditional); serialized bodies are cached per version
+RESPONSE_CACHE_TTL = 300
+
+# Per-request SQL instrumentation (social_media_api.querybudget). Requests over
+# their budget are logged; X-Query-* headers are sent when DEBUG is on.
+QUERY_BUDGET_HEADERS = DEBUG
+QUERY_BUDGETS = {
+    'GET post-list': 8,
+    'GET post-detail': 6,
+    'GET feed': 8,
+    'GET post-comments': 4,
+    'GET notifications': 5,
+    'GET following': 4,
+}
+
+# Notifications are created by a background pipeline. Use
+# 'notifications.pipeline.DatabaseBackend' with the process_notifications
+# worker for a durable queue, or ImmediateBackend in tests.
+NOTIFICATIONS_BACKEND = os.environ.get('NOTIFICATIONS_BACKEND', 'notifications.pipeline.InProcessBackend')
+NOTIFICATIONS_COALESCE_WINDOW = 3600  # seconds
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_FLUSH_INTERVAL = 1.0  # seconds
+NOTIFICATIONS_UNREAD_CACHE_TTL = 300  # seconds
+NOTIFICATIONS_RETENTION_DAYS = 90  # read notifications older than this are compacted
+
+# Live push (GET /api/notifications/stream/, served over ASGI). The in-memory
+# broker only reaches clients in the same process as the notification
+# worker; use RedisBroker when running several processes.
+NOTIFICATIONS_BROKER = os.environ.get('NOTIFICATIONS_BROKER', 'notifications.broker.InMemoryBroker')
+NOTIFICATIONS_BROKER_URL = os.environ.get('REDIS_URL')
+NOTIFICATIONS_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+NOTIFICATIONS_STREAM_REPLAY_LIMIT = 100
+NOTIFICATIONS_STREAM_REPLAY_OVERLAP = 5  # seconds re-sent before Last-Event-ID
+
 # Security settings
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'your-secret-key-here')  # Use env var in production
 SECURE_BROWSER_XSS_FILTER = True
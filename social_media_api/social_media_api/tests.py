@@ -0,0 +1,139 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from accounts import authentication
+from notifications.models import Notification
+from posts import timeline
+from posts.models import Comment, Like, Post
+from . import db_router
+from .querybudget import assert_query_budget
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryBudgetTests(TestCase):
+    """Every QUERY_BUDGETS entry, checked against a cold cache and more rows than one page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='pass12345')
+        cls.authors = [User.objects.create_user(username=f'author{i}', password='pass12345') for i in range(3)]
+        for author in cls.authors:
+            cls.reader.follow(author)
+            author.follow(cls.reader)
+            for n in range(5):
+                post = Post.objects.create(author=author, title=f'Post {n}', content='Content')
+                timeline.fan_out_post(post)
+                Comment.objects.bulk_create([
+                    Comment(post=post, author=other, content='Nice') for other in cls.authors
+                ])
+                Like.objects.create(user=cls.reader, post=post)
+        # Post detail is owner-only
+        cls.post = Post.objects.create(author=cls.reader, title='Mine', content='Content')
+        Comment.objects.bulk_create([Comment(post=cls.post, author=author, content='Nice') for author in cls.authors])
+        Notification.objects.bulk_create([
+            Notification(recipient=cls.reader, actor=author, verb=f'event {n}')
+            for author in cls.authors for n in range(5)
+        ])
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_post_list(self):
+        assert_query_budget(self.get(reverse('post-list')))
+
+    def test_post_detail(self):
+        assert_query_budget(self.get(reverse('post-detail', args=[self.post.pk])))
+
+    def test_feed(self):
+        assert_query_budget(self.get(reverse('feed')))
+
+    def test_post_comments(self):
+        assert_query_budget(self.get(reverse('post-comments', args=[self.post.pk])))
+
+    def test_notifications(self):
+        assert_query_budget(self.get(reverse('notifications')))
+
+    def test_following(self):
+        assert_query_budget(self.get(reverse('following')))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, DATABASE_REPLICAS=['replica_0'], DATABASE_REPLICA_PIN_SECONDS=1)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    replica_0 is added as a second connection to the test database, after the
+    runner has set up the real aliases, so committed rows are visible on it
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings['replica_0'] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        cls.databases = cls.databases | {'replica_0'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica_0'].close()
+        del connections['replica_0']
+        del connections.settings['replica_0']
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        Post.objects.create(author=self.user, title='Hello', content='World')
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def aliases(self, response, table):
+        return {alias for alias, sql, _ in response.query_budget.queries if f'"{table}"' in sql}
+
+    def test_safe_reads_use_the_replica(self):
+        response = self.client.get(reverse('post-list'), **self.auth)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.aliases(response, 'posts_post'), {'replica_0'})
+        self.assertEqual(self.aliases(response, 'authtoken_token'), {'default'})
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.post(reverse('post-list'), {'title': 'New', 'content': 'Post'}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.cookies[db_router.PIN_COOKIE]['max-age'], 1)
+
+        response = self.client.get(reverse('post-list'), **self.auth)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self.aliases(response, 'posts_post'), {'default'})
+
+        # Pinned by credentials too, for clients that drop the cookie
+        del self.client.cookies[db_router.PIN_COOKIE]
+        response = self.client.get(reverse('post-list'), **self.auth)
+        self.assertEqual(self.aliases(response, 'posts_post'), {'default'})
+
+        time.sleep(1.1)
+        response = self.client.get(reverse('post-list'), **self.auth)
+        self.assertEqual(self.aliases(response, 'posts_post'), {'replica_0'})
+
+    def test_other_apps_stay_on_primary(self):
+        router = db_router.ReplicaRouter()
+        token = db_router._state.set(db_router.RequestRouting())
+        try:
+            db_router._state.get().use_replica = True
+            self.assertEqual(router.db_for_read(Post), 'replica_0')
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertIsNone(router.db_for_read(Token))
+        finally:
+            db_router._state.reset(token)
@@ -18,6 +18,8 @@ from django.contrib import admin
 from django.urls import path
 from django.urls import path, include
 
+from .querybudget import QueryMetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 ]
@@ -44,4 +46,5 @@ urlpatterns = [
     path('api/accounts/', include('accounts.urls')),
     path('api/posts/', include('posts.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/metrics/queries/', QueryMetricsView.as_view(), name='query_metrics'),
 ]